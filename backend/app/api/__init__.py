@@ -1,5 +1,6 @@
 from fastapi import APIRouter
-from app.api import basic
+from app.api import basic, realtime
 
 api_router = APIRouter()
 api_router.include_router(basic.router, tags=["basic"])
+api_router.include_router(realtime.router, tags=["realtime"])
@@ -1,167 +1,668 @@
-from fastapi import APIRouter, HTTPException, UploadFile, Depends, Request
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
 import logging
-from typing import Any
-from PIL import Image
-import io
-import uuid
+import shutil
+from collections import defaultdict
+from contextlib import nullcontext
 from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import IO, Annotated, Any, AsyncIterator, Literal
+from PIL import UnidentifiedImageError
+import uuid
 
-from app.services.gemini_service import GeminiService
-from app.data_operations.basic_bucket import upload_file
-from app.data_operations.basic_images import create_image, get_images, get_image_by_id
-from app.data_operations.items import get_items_for_image
+from app.services.analyzer import create_analyzer
+from app.services.analysis_worker import AnalysisWorkerPool
+from app.services.gallery_cache import etag_matches, gallery_cache
+from app.services.image_processing import image_processor
+from app.services.ingest import ingest_image
+from app.data_operations.basic_bucket import delete_file, head_file, presign_upload
+from app.data_operations.basic_images import (
+    create_image,
+    decode_gallery_cursor,
+    get_images,
+    get_image_by_id,
+    get_image_with_items,
+)
+from app.data_operations.derivatives import get_derivatives_for_images
+from app.data_operations.items import SearchUnavailable, search_items
+from app.data_operations.jobs import (
+    finalize_uploaded_image,
+    get_latest_job_for_image,
+)
+from app.core.cache import LRUCache
 from app.core.config import settings
 from app.schemas.image import (
-    ImageInTable,
+    ImageCreateURLResponse,
     ImageGalleryResponse,
-    ImageResponse,
     ImageAndItemResponse,
+    ImageInTable,
 )
-from app.schemas.item import ItemInTable
-from app.data_operations.items import create_item
-from app.schemas.item import ItemCreate, BoundingBox
+from app.schemas.item import BoundingBox, ItemSearchQuery, ItemSearchResponse
+from app.schemas.job import JobStatusResponse, UploadAcceptedResponse
 from app.api.deps import SessionDep, verify_api_key
+from app.core.admission import AdmissionController, Overloaded
 from app.core.config import settings
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-
-# Create limiter instance
-limiter = Limiter(key_func=get_remote_address)
+from app.core.metrics import timed
+from app.core.rate_limit import limiter
 
 router = APIRouter(prefix="/basic")
 logger = logging.getLogger(__name__)
-gemini_service = GeminiService()
+analyzer = create_analyzer()
+analysis_pool = AnalysisWorkerPool(analyzer)
+# serialized ImageAndItemResponse of images whose analysis is complete
+image_detail_cache: LRUCache[uuid.UUID, bytes] = LRUCache(
+    settings.IMAGE_DETAIL_CACHE_SIZE
+)
+# inline analysis only, gallery reads and status polls never wait on it
+analysis_admission = AdmissionController(
+    initial_limit=settings.ADMISSION_INITIAL_LIMIT,
+    min_limit=settings.ADMISSION_MIN_LIMIT,
+    max_limit=settings.ADMISSION_MAX_LIMIT,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    latency_target=settings.ADMISSION_LATENCY_TARGET_SECONDS,
+)
+IMMUTABLE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+async def _build_gallery_page(db: SessionDep, cursor: str | None, limit: int) -> bytes:
+    images, next_cursor = await get_images(db, limit, cursor)
+
+    derivatives = defaultdict(list)
+    for derivative in await get_derivatives_for_images(
+        db, [image.image_id for image in images]
+    ):
+        derivatives[derivative.image_id].append(derivative)
+
+    response_array = [
+        {
+            "image_id": str(image.image_id),
+            "base_image": image.storage_key,
+            "thumbnail_image": image.thumbnail_key,
+            "height_px": image.height_px,
+            "width_px": image.width_px,
+            "thumbnail_width_px": image.thumbnail_width_px,
+            "thumbnail_height_px": image.thumbnail_height_px,
+            "derivatives": [
+                {
+                    "url": derivative.storage_key,
+                    "format": derivative.format,
+                    "width_px": derivative.width_px,
+                    "height_px": derivative.height_px,
+                }
+                for derivative in derivatives[image.image_id]
+            ],
+        }
+        for image in images
+    ]
+
+    response = ImageGalleryResponse.model_validate(
+        {"images": response_array, "cursor": next_cursor}
+    )
+    return response.model_dump_json().encode()
 
 
 @router.get("/", response_model=ImageGalleryResponse)
-async def get_basic_info(db: SessionDep):
+async def get_basic_info(
+    db: SessionDep,
+    cursor: str | None = None,
+    limit: Annotated[
+        int, Query(ge=1, le=settings.GALLERY_MAX_PAGE_SIZE)
+    ] = settings.GALLERY_PAGE_SIZE,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
     logger.info("Fetching basic gallery for default user")
 
+    if cursor:
+        try:
+            decode_gallery_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # captured before the query, see GalleryCache
+    version = gallery_cache.version
+    page = gallery_cache.get(version, cursor, limit)
+
+    if page is None:
+        try:
+            body = await _build_gallery_page(db, cursor, limit)
+        except Exception as e:
+            logger.error("Error fetching default gallery: %s", e, exc_info=True)
+            raise HTTPException(status_code=500, detail="Internal server error")
+        page = gallery_cache.set(version, cursor, limit, body)
+        logger.info("Successfully retrieved gallery for default user")
+
+    max_age = settings.GALLERY_CACHE_MAX_AGE
+    headers = {
+        "ETag": page.etag,
+        "Cache-Control": f"public, max-age={max_age}, must-revalidate",
+    }
+    if etag_matches(if_none_match, page.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=page.body, media_type="application/json", headers=headers)
+
+
+def _parse_region(region: str) -> BoundingBox:
+    """x_min,y_min,x_max,y_max in the 0-1000 coordinates of bounding boxes"""
+    try:
+        x_min, y_min, x_max, y_max = (int(value) for value in region.split(","))
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="region must be x_min,y_min,x_max,y_max"
+        )
+    if not (0 <= x_min <= x_max <= 1000 and 0 <= y_min <= y_max <= 1000):
+        raise HTTPException(
+            status_code=400, detail="region must lie within 0-1000, min before max"
+        )
+    return BoundingBox(x_min=x_min, y_min=y_min, x_max=x_max, y_max=y_max)
+
+
+@router.get("/search", response_model=ItemSearchResponse)
+async def search(
+    db: SessionDep,
+    q: Annotated[str | None, Query(max_length=200)] = None,
+    image_q: Annotated[str | None, Query(max_length=200)] = None,
+    name: Annotated[str | None, Query(min_length=3, max_length=100)] = None,
+    is_positive: bool | None = None,
+    region: str | None = None,
+    region_mode: Literal["overlaps", "within"] = "overlaps",
+    min_area: Annotated[float | None, Query(ge=0, le=1)] = None,
+    max_area: Annotated[float | None, Query(ge=0, le=1)] = None,
+    cursor: str | None = None,
+    limit: Annotated[
+        int, Query(ge=1, le=settings.SEARCH_MAX_PAGE_SIZE)
+    ] = settings.SEARCH_PAGE_SIZE,
+):
+    """Find detected items across the gallery, newest first.
+
+    q searches the item names and analyses, image_q the image analyses (web
+    search syntax: "quoted phrases", or, -excluded). name matches part of an
+    item name, is_positive=false finds flagged items. region keeps items
+    whose box overlaps, or with region_mode=within lies inside, the given
+    box; min_area and max_area bound the box area as a fraction of the frame.
+    """
+    if cursor:
+        try:
+            decode_gallery_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    filters = ItemSearchQuery(
+        text=q,
+        image_text=image_q,
+        name=name,
+        is_positive=is_positive,
+        region=_parse_region(region) if region else None,
+        region_mode=region_mode,
+        min_area=min_area,
+        max_area=max_area,
+    )
     try:
-        images = await get_images(db)
+        rows, next_cursor = await search_items(db, filters, limit, cursor)
+    except SearchUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
 
-        response_array = [
+    return {
+        "items": [
             {
-                "image_id": str(image.image_id),
-                "base_image": image.storage_key,
-                "thumbnail_image": image.thumbnail_key,
-                "height_px": image.height_px,
-                "width_px": image.width_px,
-                "thumbnail_width_px": image.thumbnail_width_px,
-                "thumbnail_height_px": image.thumbnail_height_px,
+                "item_id": row.item_id,
+                "image_id": row.image_id,
+                "name": row.name,
+                "bounding_box": row.bounding_box,
+                "analysis": row.analysis,
+                "is_positive": row.is_positive,
+                "created_at": row.created_at,
+                "base_image": row.storage_key,
+                "thumbnail_image": row.thumbnail_key,
             }
-            for image in images
-        ]
+            for row in rows
+        ],
+        "cursor": next_cursor,
+    }
 
-        logger.info("Successfully retrieved gallery for default user")
-        return {"images": response_array}
-    except Exception as e:
-        logger.error(f"Error fetching default gallery: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/{image_id}/status", response_model=JobStatusResponse)
+async def get_image_status(image_id: str, db: SessionDep):
+    try:
+        image = await get_image_by_id(db, image_id)
+    except ValueError:
+        image = None
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    job = await get_latest_job_for_image(db, image_id)
+
+    return {
+        "image_id": image.image_id,
+        "status": image.status,
+        "is_analysis_complete": bool(image.is_analysis_complete),
+        "job_id": job.job_id if job else None,
+        "job_status": job.status if job else None,
+        "duplicate_of": job.duplicate_of if job else None,
+        "attempts": job.attempts if job else 0,
+        "error": job.error if job else None,
+    }
 
 
 @router.get("/{image_id}", response_model=ImageAndItemResponse)
 async def get_image(image_id: str, db: SessionDep):
-    image = await get_image_by_id(db, image_id)
-    if not image:
+    try:
+        image_uuid = uuid.UUID(image_id)
+    except ValueError:
         raise HTTPException(status_code=404, detail="Image not found")
 
-    items = await get_items_for_image(db, image_id)
+    body = image_detail_cache.get(image_uuid)
+    if body is not None:
+        return Response(
+            content=body, media_type="application/json", headers=IMMUTABLE_HEADERS
+        )
+
+    image = await get_image_with_items(db, image_uuid)
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    # its stored original was deleted, /{image_id}/status says what it duplicates
+    if image.status == "duplicate":
+        raise HTTPException(status_code=410, detail="Image was rejected as a duplicate")
 
-    # Convert SQLAlchemy objects to Pydantic models
-    image_response = ImageResponse.model_validate(image)
-    items_response = [ItemInTable.model_validate(item) for item in items[0]]
+    # validated once, straight from the ORM objects
+    response = ImageAndItemResponse.model_validate(
+        {"image": image, "items": image.items}, from_attributes=True
+    )
+    body = response.model_dump_json().encode()
 
-    return {"image": image_response, "items": items_response}
+    # a completed analysis is final, anything earlier is still changing
+    if image.is_analysis_complete:
+        image_detail_cache.set(image_uuid, body)
+        headers = IMMUTABLE_HEADERS
+    else:
+        headers = {"Cache-Control": "no-cache"}
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.post("/upload")
 @limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
-async def upload_image(request: Request, file: UploadFile) -> dict[str, Any]:
+async def upload_image(
+    request: Request,
+    file: UploadFile,
+    mode: Literal["gemini", "local", "both"] = "gemini",
+) -> dict[str, Any]:
+    """Analyze an image without storing it.
+
+    mode picks the analyzer: "gemini" is the configured ANALYZER_BACKEND
+    (Gemini unless set otherwise), "local" the heuristics (milliseconds, no
+    network call, no objects), "both" returns the heuristics under
+    local_analysis.
+    """
+    if file.content_type and file.content_type != "image/jpeg":
+        raise HTTPException(status_code=400, detail="Invalid file type")
+
+    if file.size and file.size > 25 * 1024 * 1024:
+        raise HTTPException(status_code=400, detail="File too large")
+
+    # the heuristics alone cost milliseconds, only analyzer calls are admitted
+    admission = analysis_admission.admit() if mode != "local" else nullcontext()
+    async with admission:
+        try:
+            with timed("upload.read"):
+                data = await file.read()
+            processed = await image_processor.process(data)
+            if mode == "local":
+                return {"analysis": processed.local_analysis}
+
+            with timed("analyze"):
+                analysis = await analyzer.analyze_image_async(processed.analysis_image)
+            if mode == "both":
+                return {
+                    "analysis": analysis,
+                    "local_analysis": processed.local_analysis,
+                }
+            return {"analysis": analysis}
+        except UnidentifiedImageError:
+            raise HTTPException(status_code=400, detail="Not a readable image")
+        except TimeoutError:
+            raise HTTPException(status_code=504, detail="Analysis timed out")
+        except Exception as e:
+            logger.error("Error uploading file: %s", e, exc_info=True)
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """Streams while holding an analysis_admission slot, released when the
+    response is done however it ends. The body iterator's own finally is not
+    enough: it never runs if the client is gone before the body starts.
+    """
+
+    def __init__(self, content: AsyncIterator[bytes], admitted_at: float, **kwargs):
+        super().__init__(content, **kwargs)
+        self.admitted_at = admitted_at
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            analysis_admission.release(self.admitted_at)
+
+
+def _sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+@router.post("/upload/stream")
+@limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
+async def upload_image_stream(request: Request, file: UploadFile) -> StreamingResponse:
+    """Analyze an image without storing it, streamed as Server-Sent Events.
+
+    A local event with the heuristics comes first, then the analyzer's result
+    piece by piece (analysis, score, object) as the model writes it, and done
+    with the complete result. Failures after the stream started arrive as an
+    error event. This is a POST, so read it with fetch rather than EventSource.
+    """
     if file.content_type and file.content_type != "image/jpeg":
         raise HTTPException(status_code=400, detail="Invalid file type")
 
     if file.size and file.size > 25 * 1024 * 1024:
         raise HTTPException(status_code=400, detail="File too large")
 
+    # admitted before the response starts so an overload is still a 503,
+    # the slot is held until the stream ends
+    admitted_at = await analysis_admission.acquire()
+    try:
+        processed = await image_processor.process(await file.read())
+    except UnidentifiedImageError:
+        analysis_admission.release(admitted_at)
+        raise HTTPException(status_code=400, detail="Not a readable image")
+    except BaseException:
+        analysis_admission.release(admitted_at)
+        raise
+
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            yield _sse("local", processed.local_analysis)
+            async for event, data in analyzer.analyze_image_stream(
+                processed.analysis_image
+            ):
+                yield _sse(event, data)
+        except TimeoutError:
+            yield _sse("error", {"detail": "Analysis timed out"})
+        except Exception as e:
+            logger.error("Error streaming analysis: %s", e, exc_info=True)
+            yield _sse("error", {"detail": "Internal server error"})
+
+    return _AdmittedStreamingResponse(
+        events(),
+        admitted_at,
+        media_type="text/event-stream",
+        # proxies must not buffer the stream, or the early events arrive late
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _batch_item_error(file: UploadFile) -> str | None:
+    if file.content_type and file.content_type != "image/jpeg":
+        return "Invalid file type"
+    if file.size and file.size > 25 * 1024 * 1024:
+        return "File too large"
+    return None
+
+
+def _spooled_copy(source: IO[bytes]) -> SpooledTemporaryFile[bytes]:
+    """Copy an upload so it outlives the request's form, past 1MB on disk"""
+    copy: SpooledTemporaryFile[bytes] = SpooledTemporaryFile(max_size=1024 * 1024)
+    source.seek(0)
+    shutil.copyfileobj(source, copy)
+    copy.seek(0)
+    return copy
+
+
+def _read_and_close(file: IO[bytes]) -> bytes:
+    with file:
+        return file.read()
+
+
+async def _analyze_batch_item(
+    semaphore: asyncio.Semaphore,
+    index: int,
+    filename: str | None,
+    error: str | None,
+    upload: IO[bytes] | None,
+) -> dict[str, Any]:
+    """Analyze one image of a batch, failures are reported not raised. The
+    image is only read into memory once it holds a semaphore slot"""
+    result: dict[str, Any] = {"index": index, "filename": filename}
+    if upload is None:
+        return {**result, "status": "error", "error": error}
+
     try:
-        analysis = gemini_service.analyze_image(file.file.read())
-        return {"analysis": analysis}
+        async with semaphore, analysis_admission.admit():
+            data = await asyncio.to_thread(_read_and_close, upload)
+            processed = await image_processor.process(data)
+            analysis = await analyzer.analyze_image_async(processed.analysis_image)
+        return {**result, "status": "ok", "analysis": analysis}
+    except Overloaded:
+        return {**result, "status": "error", "error": "Server is busy, retry later"}
+    except TimeoutError:
+        return {**result, "status": "error", "error": "Analysis timed out"}
+    except UnidentifiedImageError:
+        return {**result, "status": "error", "error": "Not a readable image"}
     except Exception as e:
-        logger.error(f"Error uploading file: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        logger.error("Error analyzing batch item %s: %s", index, e, exc_info=True)
+        return {**result, "status": "error", "error": "Internal server error"}
+
 
+@router.post("/upload-batch")
+@limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
+async def upload_batch(request: Request, files: list[UploadFile]) -> StreamingResponse:
+    """Analyze many images from one multipart request.
 
-@router.post("/upload-for-gallery")
+    Results stream back as NDJSON in completion order, one line per image
+    carrying its index in the request, then a summary line. A failing image
+    only fails its own line.
+    """
+    if len(files) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_FILES} files per batch",
+        )
+
+    # the request's spooled files are closed once streaming starts, copy the
+    # acceptable ones; parts over the size limit are never read
+    uploads: list[tuple[str | None, str | None, IO[bytes] | None]] = []
+    for file in files:
+        error = _batch_item_error(file)
+        copy = None if error else await asyncio.to_thread(_spooled_copy, file.file)
+        uploads.append((file.filename, error, copy))
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def results() -> AsyncIterator[bytes]:
+        tasks = [
+            asyncio.create_task(_analyze_batch_item(semaphore, index, *upload))
+            for index, upload in enumerate(uploads)
+        ]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                failed += result["status"] != "ok"
+                yield (json.dumps(result) + "\n").encode()
+            summary = {"done": True, "total": len(tasks), "failed": failed}
+            yield (json.dumps(summary) + "\n").encode()
+        finally:
+            # client went away, don't keep analyzing for nobody
+            for task in tasks:
+                task.cancel()
+            for _, _, upload in uploads:
+                if upload is not None:
+                    upload.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/upload-for-gallery", status_code=202, response_model=UploadAcceptedResponse
+)
 @limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
 async def upload_for_gallery(
-    file: UploadFile, 
+    file: UploadFile,
     db: SessionDep,
     request: Request,
+    on_duplicate: Literal["analyze", "reuse", "reject"] = "analyze",
     api_key: str = Depends(verify_api_key),
-) -> dict[str, str]:
+) -> dict[str, Any]:
+    """Queue an image for the gallery.
+
+    on_duplicate controls near-duplicates of an existing gallery image: analyze
+    them as usual, reuse the match's analysis and items, or reject the upload.
+    A rejected upload's stored original is deleted, its status stays
+    "duplicate" with the image it duplicates and its detail answers 410.
+    """
     if file.content_type and file.content_type != "image/jpeg":
         raise HTTPException(status_code=400, detail="Invalid file type")
 
     if file.size and file.size > 25 * 1024 * 1024:
         raise HTTPException(status_code=400, detail="File too large")
 
+    if not analysis_pool.has_capacity():
+        raise HTTPException(
+            status_code=503,
+            detail="Analysis queue is full, try again later",
+            headers={"Retry-After": "30"},
+        )
+
     try:
-        pil_image = Image.open(io.BytesIO(file.file.read()))
-        width, height = pil_image.size  # get original before thumbnailing later
-        thumbnail_image = pil_image.copy()
-        thumbnail_image.thumbnail((750, 750))
+        content_type = file.content_type if file.content_type else "image/jpeg"
+        job = await ingest_image(
+            db, file.file, file.filename, content_type, duplicate_policy=on_duplicate
+        )
+        # persisted now, if the queue filled up meanwhile the rescan runs it
+        analysis_pool.submit(job.job_id)
 
-        # upload the files to s3
-        key = await upload_file(pil_image)
-        thumbnail_key = await upload_file(thumbnail_image)
+        return {
+            "image_id": job.image_id,
+            "job_id": job.job_id,
+            "status": "pending",
+            "status_url": f"{settings.API_STR}/basic/{job.image_id}/status",
+        }
 
-        gemini_response = gemini_service.analyze_image(pil_image)
-        image_id = uuid.uuid4()
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=400, detail="Not a readable image")
+    except Exception as e:
+        logger.error("Error uploading file: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-        # add image to db
-        image_data = ImageInTable(
+
+@router.post("/upload-url", status_code=201, response_model=ImageCreateURLResponse)
+@limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
+async def create_upload_url(
+    request: Request,
+    db: SessionDep,
+    filename: str | None = None,
+    api_key: str = Depends(verify_api_key),
+) -> dict[str, Any]:
+    """Start a direct upload, the bytes never pass through the API.
+
+    POST the file to presigned_url["url"] as multipart form data with every
+    field of presigned_url["fields"] (the file last), then call finalize_url.
+    The image is recorded as "uploading" and stays out of the gallery until
+    it is finalized and analyzed.
+    """
+    image_id = uuid.uuid4()
+    key = str(image_id)
+    presigned = presign_upload(key, "image/jpeg")
+
+    await create_image(
+        db,
+        ImageInTable(
             image_id=image_id,
-            original_name=file.filename if file.filename else "unknown",
+            original_name=filename if filename else "unknown",
             bucket=settings.AWS_BASIC_BUCKET_NAME,
             storage_key=f"{settings.AWS_PUBLIC_BUCKET_URL}{key}",
-            thumbnail_key=f"{settings.AWS_PUBLIC_BUCKET_URL}{thumbnail_key}",
-            size_bytes=file.size,
-            mime_type=file.content_type if file.content_type else "image/*",
-            width_px=width,
-            height_px=height,
-            thumbnail_width_px=thumbnail_image.width,
-            thumbnail_height_px=thumbnail_image.height,
-            analysis=gemini_response["analysis"],
+            thumbnail_key="",
+            size_bytes=0,  # known once the upload is finalized
+            mime_type="image/jpeg",
+            width_px=0,  # set by the analysis worker
+            height_px=0,
+            thumbnail_width_px=0,
+            thumbnail_height_px=0,
             created_at=datetime.now(),
             updated_at=datetime.now(),
-            is_analysis_complete=True,
-            score=gemini_response["scores"],
-            status="complete",
+            status="uploading",
+        ),
+    )
+
+    return {
+        "image_id": image_id,
+        "presigned_url": presigned,
+        "finalize_url": f"{settings.API_STR}/basic/{image_id}/finalize",
+        "expires_in": settings.DIRECT_UPLOAD_EXPIRES_SECONDS,
+        "message": "Upload the file with the presigned form, then finalize",
+    }
+
+
+@router.post(
+    "/{image_id}/finalize", status_code=202, response_model=UploadAcceptedResponse
+)
+@limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
+async def finalize_upload(
+    image_id: str,
+    request: Request,
+    db: SessionDep,
+    on_duplicate: Literal["analyze", "reuse", "reject"] = "analyze",
+    api_key: str = Depends(verify_api_key),
+) -> dict[str, Any]:
+    """Queue a directly uploaded image for analysis, read back from the bucket
+    by the worker. on_duplicate works as in upload-for-gallery.
+    """
+    try:
+        image = await get_image_by_id(db, image_id)
+    except ValueError:
+        image = None
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if image.status != "uploading":
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+
+    key = str(image.image_id)
+    uploaded = await head_file(key)
+    if uploaded is None:
+        raise HTTPException(status_code=400, detail="File has not been uploaded")
+    # the signed policy already caps the size, this guards against a changed limit
+    if uploaded["ContentLength"] > settings.DIRECT_UPLOAD_MAX_BYTES:
+        await delete_file(key)
+        raise HTTPException(status_code=400, detail="File too large")
+
+    if not analysis_pool.has_capacity():
+        raise HTTPException(
+            status_code=503,
+            detail="Analysis queue is full, try again later",
+            headers={"Retry-After": "30"},
         )
-        db_response = await create_image(db, image_data)
-        if not db_response:
-            raise HTTPException(status_code=500, detail="Failed to create image")
-
-        # add item to db
-        for item in gemini_response["objects"]:
-            item_data = ItemCreate(
-                image_id=image_id,
-                name=item["name"],
-                bounding_box=BoundingBox(
-                    y_min=item["bounding_box"]["y_min"],
-                    y_max=item["bounding_box"]["y_max"],
-                    x_min=item["bounding_box"]["x_min"],
-                    x_max=item["bounding_box"]["x_max"],
-                ),
-                analysis=item["analysis"],
-                created_at=datetime.now(),
-                is_positive=item["is_perfect"] == "true",
-            )
-            await create_item(db, item_data)
-
-        return {"message": "Image uploaded successfully"}
 
-    except Exception as e:
-        logger.error(f"Error uploading file: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal server error")
+    job = await finalize_uploaded_image(
+        db,
+        image.image_id,
+        source_key=key,
+        size_bytes=uploaded["ContentLength"],
+        duplicate_policy=on_duplicate,
+    )
+    if job is None:
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+    # persisted now, if the queue filled up meanwhile the rescan runs it
+    analysis_pool.submit(job.job_id)
+
+    return {
+        "image_id": job.image_id,
+        "job_id": job.job_id,
+        "status": "pending",
+        "status_url": f"{settings.API_STR}/basic/{job.image_id}/status",
+    }
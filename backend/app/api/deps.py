@@ -1,9 +1,17 @@
 from typing import Annotated
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import Depends, HTTPException, Header
+from fastapi import (
+    Depends,
+    HTTPException,
+    Header,
+    Query,
+    WebSocketException,
+    status,
+)
 
 from app.core.database_async import get_db_session
 from app.core.config import settings
+from app.core.tokens import verify_token
 
 SessionDep = Annotated[AsyncSession, Depends(get_db_session)]
 
@@ -17,3 +25,14 @@ async def verify_api_key(x_api_key: str = Header(None)) -> str:
         raise HTTPException(status_code=403, detail="Invalid API key")
     
     return x_api_key
+
+
+async def verify_realtime_token(token: str | None = Query(None)) -> str:
+    """Checks the ?token= of a realtime WebSocket, failing closes the handshake.
+    Browsers can't set headers on a WebSocket, so instead of the API key it
+    takes a short-lived token from POST /realtime/token."""
+    if token is None or not verify_token(token, "realtime"):
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION, reason="Invalid token"
+        )
+    return token
@@ -0,0 +1,103 @@
+from fastapi import (
+    APIRouter,
+    Depends,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from collections import Counter
+from typing import Any
+import asyncio
+import logging
+
+from app.api.basic import analysis_admission, analyzer
+from app.api.deps import verify_api_key, verify_realtime_token
+from app.core.config import settings
+from app.core.rate_limit import limiter
+from app.core.tokens import issue_token
+from app.schemas.realtime import RealtimeTokenResponse
+from app.services.realtime import FramingSession
+
+router = APIRouter(prefix="/realtime")
+logger = logging.getLogger(__name__)
+
+# open sessions per client IP
+sessions_by_client: Counter[str] = Counter()
+
+
+@router.post("/token", response_model=RealtimeTokenResponse)
+@limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
+async def create_realtime_token(
+    request: Request, api_key: str = Depends(verify_api_key)
+) -> dict[str, Any]:
+    """Issue a short-lived token for opening /realtime/frames.
+
+    The token only opens the realtime socket, so the API key itself never
+    reaches a browser or ends up in a URL.
+    """
+    return {
+        "token": issue_token("realtime", settings.REALTIME_TOKEN_TTL_SECONDS),
+        "expires_in": settings.REALTIME_TOKEN_TTL_SECONDS,
+        "websocket_url": f"{settings.API_STR}/realtime/frames",
+    }
+
+
+@router.websocket("/frames")
+async def framing_feedback(
+    websocket: WebSocket, token: str = Depends(verify_realtime_token)
+):
+    """Stream camera frames in as binary JPEG messages, get feedback back.
+
+    Messages sent to the client, all JSON with a "type":
+    - ready: once, with the limits of this connection
+    - frame: quick exposure and steadiness feedback for a processed frame
+    - analysis: a full composition analysis of a recent frame
+    - error: a frame or analysis failed, the connection stays open
+    Frames are numbered from 1 in the order they are received ("seq").
+    Needs a token from POST /realtime/token as ?token=.
+    """
+    client = websocket.client.host if websocket.client else "unknown"
+    if (
+        FramingSession.active >= settings.REALTIME_MAX_SESSIONS
+        or sessions_by_client[client] >= settings.REALTIME_MAX_SESSIONS_PER_CLIENT
+    ):
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    await websocket.accept()
+    FramingSession.active += 1
+    sessions_by_client[client] += 1
+    session = FramingSession(websocket.send_json, analyzer, analysis_admission)
+    session.push(
+        {
+            "type": "ready",
+            "max_frame_bytes": settings.REALTIME_MAX_FRAME_BYTES,
+            "analysis_interval_seconds": session.analysis_interval,
+        }
+    )
+    runner = asyncio.create_task(session.run())
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            frame = message.get("bytes")
+            if frame is None:
+                session.push({"type": "error", "detail": "Send frames as binary"})
+            elif len(frame) > settings.REALTIME_MAX_FRAME_BYTES:
+                session.push({"type": "error", "detail": "Frame too large"})
+            else:
+                session.offer(frame)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        FramingSession.active -= 1
+        sessions_by_client[client] -= 1
+        if not sessions_by_client[client]:
+            del sessions_by_client[client]
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        logger.info("Realtime session closed: %s", session.stats())
@@ -0,0 +1,146 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+
+class Overloaded(Exception):
+    """Raised instead of admitting a request, answered with 503 and Retry-After"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Adaptive concurrency limit for expensive requests (AIMD).
+
+    At most `limit` admitted requests run at once. The rest wait in a FIFO
+    queue of queue_size for up to queue_timeout seconds; beyond that they
+    are shed with Overloaded. The limit follows observed latency like TCP
+    congestion control: while the limit is being used and requests finish
+    within latency_target it grows by about one per limit completions, a
+    request slower than the target cuts it by `backoff`. Only one cut is made
+    per latency period, so a burst of slow responses counts once.
+
+    Only touched from the event loop, no locking.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        queue_size: int,
+        queue_timeout: float,
+        latency_target: float,
+        backoff: float = 0.75,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.latency_target = latency_target
+        self.backoff = backoff
+
+        self.in_flight = 0
+        self.latency_ewma: float | None = None
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._last_decrease = -math.inf
+
+        self.admitted = 0
+        self.shed = 0
+        self.queue_timeouts = 0
+        self.decreases = 0
+
+    async def acquire(self) -> float:
+        """Wait for a slot, returns the admission time to pass to release()"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return time.monotonic()
+
+        if len(self._waiters) >= self.queue_size:
+            self.shed += 1
+            raise Overloaded(self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just as we gave up, pass it on
+                self.in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                # _wake may already have dropped it as done
+                self._waiters.remove(waiter)
+            if isinstance(e, TimeoutError):
+                self.queue_timeouts += 1
+                self.shed += 1
+                raise Overloaded(self.retry_after()) from None
+            raise
+
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, admitted_at: float) -> None:
+        latency = time.monotonic() - admitted_at
+        saturated = self.in_flight >= int(self.limit) or bool(self._waiters)
+        self.in_flight -= 1
+        self._adjust(latency, saturated)
+        self._wake()
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        admitted_at = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(admitted_at)
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead has likely drained, 1 to 60"""
+        if self.latency_ewma is None:
+            return 1
+        waves = (len(self._waiters) + 1) / max(1, int(self.limit))
+        return min(60, max(1, math.ceil(self.latency_ewma * waves)))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "latency_ewma_seconds": self.latency_ewma,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "queue_timeouts": self.queue_timeouts,
+            "decreases": self.decreases,
+        }
+
+    def _adjust(self, latency: float, saturated: bool) -> None:
+        self.latency_ewma = (
+            latency
+            if self.latency_ewma is None
+            else 0.8 * self.latency_ewma + 0.2 * latency
+        )
+        now = time.monotonic()
+        if latency > self.latency_target:
+            if now - self._last_decrease > latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+                self.decreases += 1
+        elif saturated:
+            # an idle server proves nothing about a higher limit
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
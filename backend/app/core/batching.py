@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchMetrics:
+    items: int = 0
+    batches: int = 0
+    largest_batch: int = 0
+    run_seconds_total: float = 0.0
+
+
+class MicroBatcher(Generic[T, R]):
+    """Group concurrent calls into batches for a function that prefers them.
+
+    submit() queues one item and waits for its result. A single collector task
+    takes the first waiting item, keeps collecting until it has max_batch items
+    or max_wait_ms have passed, then runs run_batch on the whole list in a
+    worker thread. run_batch must return one result per item, in order; if it
+    raises, every caller in that batch gets the exception.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list[T]], list[R]],
+        max_batch: int,
+        max_wait_ms: float,
+    ):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = BatchMetrics()
+        self._queue: asyncio.Queue[tuple[T, asyncio.Future[R]]] = asyncio.Queue()
+        self._collector: asyncio.Task | None = None
+
+    async def submit(self, item: T) -> R:
+        if self._collector is None or self._collector.done():
+            self._collector = asyncio.create_task(self._collect())
+        future: asyncio.Future[R] = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def close(self) -> None:
+        if self._collector:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+            self._collector = None
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except TimeoutError:
+                    break
+
+            # a caller that was cancelled while waiting needs no result
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if batch:
+                await self._run(batch)
+
+    async def _run(self, batch: list[tuple[T, asyncio.Future[R]]]) -> None:
+        started_at = time.perf_counter()
+        try:
+            results = await asyncio.to_thread(
+                self.run_batch, [item for item, _ in batch]
+            )
+            if len(results) != len(batch):
+                raise ValueError(f"{len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.error("Batch of %s failed: %s", len(batch), e, exc_info=True)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.metrics.batches += 1
+            self.metrics.items += len(batch)
+            self.metrics.largest_batch = max(self.metrics.largest_batch, len(batch))
+            self.metrics.run_seconds_total += time.perf_counter() - started_at
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -24,27 +25,116 @@ class Settings(BaseSettings):
 
     # Database
     DB_CXN_STRING: str = "missing"
+    # "pgbouncer": no local pool, no prepared statement reuse (transaction mode
+    # PgBouncer). "pooled": QueuePool + statement cache for direct connections.
+    DB_POOL_MODE: Literal["pgbouncer", "pooled"] = "pgbouncer"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 100
 
     # Google Gemini
     GEMINI_API_KEY: str | None = None
+    GEMINI_MAX_CONCURRENCY: int = 4  # per process, shared by every caller
+    GEMINI_TIMEOUT_SECONDS: float = 60.0
+
+    # Image analysis backend: "gemini", "local" (CPU heuristics, scored by an
+    # ONNX model when LOCAL_MODEL_PATH is set) or "fake" (deterministic)
+    ANALYZER_BACKEND: Literal["gemini", "local", "fake"] = "gemini"
+    LOCAL_MODEL_PATH: str | None = None
+    LOCAL_MODEL_THREADS: int = 0  # ONNX Runtime intra-op threads, 0 lets it pick
+    # concurrent requests are batched until either limit is reached
+    LOCAL_BATCH_MAX_SIZE: int = 16
+    LOCAL_BATCH_MAX_WAIT_MS: float = 10.0
+    FAKE_ANALYZER_DELAY_SECONDS: float = 0.0
 
     # File upload settings
     MAX_FILE_SIZE: int = 20 * 1024 * 1024  # 20MB
+    # Presigned POST uploads straight to the bucket
+    DIRECT_UPLOAD_MAX_BYTES: int = 25 * 1024 * 1024
+    DIRECT_UPLOAD_EXPIRES_SECONDS: int = 900
+    DIRECT_UPLOAD_SWEEP_INTERVAL_SECONDS: int = 600  # abandoned uploads cleanup
     ALLOWED_EXTENSIONS: list[str] = [".jpg", ".jpeg", ".png", ".raw"]
-    
+
     # Security
     API_KEY: str = "missing"
-    
+    # signs scoped tokens like the realtime one, derived from API_KEY if unset
+    TOKEN_SECRET: str | None = None
+
     # Rate limiting
     RATE_LIMIT_PER_MINUTE: int = 10
+    # Admission control for inline analysis, the concurrency limit adapts
+    # between MIN and MAX to keep latency under the target
+    ADMISSION_INITIAL_LIMIT: int = 8
+    ADMISSION_MIN_LIMIT: int = 1
+    ADMISSION_MAX_LIMIT: int = 64
+    ADMISSION_LATENCY_TARGET_SECONDS: float = 20.0
+    ADMISSION_QUEUE_SIZE: int = 32  # waiting requests before shedding
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 10.0
+
+    # Gallery pagination
+    GALLERY_PAGE_SIZE: int = 50
+    GALLERY_MAX_PAGE_SIZE: int = 200
+    # Item search pagination
+    SEARCH_PAGE_SIZE: int = 50
+    SEARCH_MAX_PAGE_SIZE: int = 200
+    # Gallery response cache, pages are invalidated when an image is added
+    GALLERY_CACHE_SIZE: int = 256
+    GALLERY_CACHE_TTL_SECONDS: int = 300
+    GALLERY_CACHE_MAX_AGE: int = 30  # Cache-Control max-age for clients and CDNs
+
+    # Batch analysis, per request
+    BATCH_MAX_FILES: int = 20
+    BATCH_CONCURRENCY: int = 4
+
+    # Completed image details never change, cached by image_id
+    IMAGE_DETAIL_CACHE_SIZE: int = 1024
+
+    # Real-time framing feedback over WebSocket
+    REALTIME_MAX_SESSIONS: int = 500  # per process
+    REALTIME_MAX_SESSIONS_PER_CLIENT: int = 4  # per process and client IP
+    REALTIME_MAX_FRAME_BYTES: int = 1024 * 1024
+    REALTIME_ANALYSIS_INTERVAL_SECONDS: float = 3.0  # min gap between analyses
+    REALTIME_OUTBOX_SIZE: int = 16  # queued messages before feedback is dropped
+    REALTIME_TOKEN_TTL_SECONDS: int = 60  # only checked when the socket opens
+
+    # Image decoding, 0 picks min(4, cpu count)
+    IMAGE_PROCESS_WORKERS: int = 0
+    # Gallery derivatives, longest side in px, each size is stored in every format
+    DERIVATIVE_SIZES: list[int] = [256, 512, 1024, 2048]
+    DERIVATIVE_FORMATS: list[str] = ["webp", "jpeg"]
+
+    # Background analysis jobs
+    ANALYSIS_WORKERS: int = 2
+    ANALYSIS_QUEUE_SIZE: int = 100
+    ANALYSIS_MAX_ATTEMPTS: int = 3
+    ANALYSIS_RETRY_BASE_SECONDS: float = 5.0  # doubled per attempt, with jitter
+    ANALYSIS_RETRY_MAX_SECONDS: float = 300.0
+    ANALYSIS_RESCAN_INTERVAL_SECONDS: float = 60.0  # picks up jobs no queue holds
+    ANALYSIS_STALE_RUNNING_SECONDS: float = 900.0  # then its worker is taken as dead
+
+    # Near-duplicate detection, max Hamming distance between 64 bit dHashes
+    DUPLICATE_MAX_DISTANCE: int = 6
+
+    # Analysis result cache
+    ANALYSIS_CACHE_MEMORY_SIZE: int = 512
+    ANALYSIS_CACHE_TTL_SECONDS: int = 30 * 24 * 60 * 60  # 30 days
+    ANALYSIS_CACHE_MAX_ROWS: int = 50_000
 
     env: str = "dev"
     echo_sql: bool = False
     log_level: str = "INFO"
+    # Outside dev, per logger name prefix: fraction of records below WARNING
+    # kept, and records below WARNING allowed per second
+    LOG_SAMPLE_RATES: dict[str, float] = {}
+    LOG_RATE_LIMITS: dict[str, float] = {"app.data_operations": 50.0}
 
     AWS_BUCKET_NAME: str = "dev"
     AWS_BASIC_BUCKET_NAME: str = "public-lubezki-images"
     AWS_PUBLIC_BUCKET_URL: str = "https://public-lubezki-images.s3.amazonaws.com/"
+    AWS_ENDPOINT_URL: str | None = None  # e.g. a local MinIO or moto server
+    S3_MAX_POOL_CONNECTIONS: int = 32
 
     PUBLIC_AUTH_KEY: str = "missing"
 
@@ -1,5 +1,8 @@
+import asyncio
 import contextlib
 import logging
+import time
+from dataclasses import dataclass, asdict
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     create_async_engine,
@@ -7,12 +10,14 @@ from sqlalchemy.ext.asyncio import (
 )
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.types import JSON
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from typing import Any, AsyncIterator
-from sqlalchemy import text
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
 from uuid import uuid4
 
 from app.core.config import settings
+from app.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -24,18 +29,109 @@ class Base(DeclarativeBase):
     }
 
 
+# Columns added to tables that may already exist, create_all only creates
+# missing tables. Every statement must be idempotent. Indexes on existing
+# tables are built CONCURRENTLY by the scripts in migrations instead, a plain
+# CREATE INDEX here would block writes while the app starts.
+POSTGRES_SCHEMA_UPGRADES = [
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS phash BIGINT",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS local_analysis JSON",
+]
+
+
+@dataclass
+class PoolMetrics:
+    connects: int = 0  # new physical connections
+    checkouts: int = 0
+    checked_out: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+pool_metrics = PoolMetrics()
+
+query_seconds = metrics.histogram(
+    "lubezki_db_query_seconds", "Database statement execution time", ["statement"]
+)
+query_errors = metrics.counter(
+    "lubezki_db_query_errors_total", "Database statements that failed", ["statement"]
+)
+pool_wait_seconds = metrics.histogram(
+    "lubezki_db_pool_wait_seconds", "Time spent waiting for a pooled connection"
+)
+
+
+def _statement_kind(statement: str) -> str:
+    """First keyword only, full statements would explode the label set"""
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started_at
+            pool_metrics.record_wait(waited)
+            pool_wait_seconds.observe(waited)
+
+
+def pool_options(host: str, engine_kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Engine options for the configured pool mode.
+
+    pgbouncer: no client side pool and no named prepared statements, safe
+    behind PgBouncer in transaction mode but every session pays for a new
+    connection. pooled: a local QueuePool with asyncpg's statement cache, for
+    connecting to Postgres directly.
+    """
+    is_asyncpg = make_url(host).drivername == "postgresql+asyncpg"
+
+    if engine_kwargs.get("pool_mode", "pgbouncer") != "pooled":
+        options: dict[str, Any] = {"poolclass": NullPool}
+        if is_asyncpg:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        return options
+
+    options = {
+        "poolclass": MeasuredQueuePool,
+        "pool_size": engine_kwargs.get("pool_size", 10),
+        "max_overflow": engine_kwargs.get("max_overflow", 10),
+        "pool_timeout": engine_kwargs.get("pool_timeout", 30),
+        "pool_recycle": engine_kwargs.get("pool_recycle", 1800),
+        "pool_pre_ping": True,
+    }
+    if is_asyncpg:
+        cache_size = engine_kwargs.get("statement_cache_size", 100)
+        options["connect_args"] = {
+            "statement_cache_size": cache_size,
+            "prepared_statement_cache_size": cache_size,
+        }
+    return options
+
+
 # lots of help from https://github.com/ThomasAitken/demo-fastapi-async-sqlalchemy/blob/main/backend/app/api/dependencies/core.py
 class DatabaseSessionManager:
     def __init__(self, host: str, engine_kwargs: dict[str, Any]):
+        self.pool_mode = engine_kwargs.get("pool_mode", "pgbouncer")
+        self.pool_size = engine_kwargs.get("pool_size", 10)
         self._engine = create_async_engine(
             host,
             echo=engine_kwargs.get("echo", False),
-            poolclass=NullPool,
-            connect_args={
-                "statement_cache_size": 0,
-                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
-            },
+            **pool_options(host, engine_kwargs),
         )
+        self._track_pool(self._engine.sync_engine)
+        self._track_queries(self._engine.sync_engine)
         self._sessionmaker = async_sessionmaker(
             bind=self._engine,
             autocommit=False,
@@ -57,6 +153,65 @@ class DatabaseSessionManager:
         if self._engine:
             await self._engine.dispose()
 
+    async def create_tables(self) -> None:
+        """Create any tables that do not exist yet, existing tables are left alone"""
+        async with self._engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            if conn.dialect.name == "postgresql":
+                for statement in POSTGRES_SCHEMA_UPGRADES:
+                    await conn.execute(text(statement))
+
+    @staticmethod
+    def _track_pool(sync_engine) -> None:
+        @event.listens_for(sync_engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            pool_metrics.connects += 1
+
+        @event.listens_for(sync_engine, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            pool_metrics.checkouts += 1
+            pool_metrics.checked_out += 1
+
+        @event.listens_for(sync_engine, "checkin")
+        def _on_checkin(dbapi_connection, connection_record):
+            pool_metrics.checked_out -= 1
+
+    @staticmethod
+    def _track_queries(sync_engine) -> None:
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            started_at = conn.info["query_started_at"].pop()
+            query_seconds.observe(
+                time.perf_counter() - started_at, _statement_kind(statement)
+            )
+
+        @event.listens_for(sync_engine, "handle_error")
+        def _on_error(exception_context):
+            connection = exception_context.connection
+            if connection is not None and connection.info.get("query_started_at"):
+                connection.info["query_started_at"].pop()
+            query_errors.inc(_statement_kind(exception_context.statement or ""))
+
+    async def warm_up(self) -> None:
+        """Open pool_size connections up front so the first requests don't pay
+        for connecting, a no-op without a pool"""
+        if self.pool_mode != "pooled":
+            return
+
+        async def _open() -> None:
+            async with self._engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        await asyncio.gather(*(_open() for _ in range(self.pool_size)))
+        logger.info("Warmed database pool with %s connections", self.pool_size)
+
+    def pool_stats(self) -> dict[str, Any]:
+        return {"mode": self.pool_mode, **asdict(pool_metrics)}
+
     async def health_check(self) -> bool:
         """Simple health check"""
         async with self.session() as session:
@@ -66,7 +221,16 @@ class DatabaseSessionManager:
 
 # Create the session manager
 session_manager = DatabaseSessionManager(
-    settings.DB_CXN_STRING, {"echo": settings.echo_sql}
+    settings.DB_CXN_STRING,
+    {
+        "echo": settings.echo_sql,
+        "pool_mode": settings.DB_POOL_MODE,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    },
 )
 
 
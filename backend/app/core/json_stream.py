@@ -0,0 +1,117 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, cast
+
+JSONPath = tuple[str | int, ...]
+
+WHITESPACE = " \t\r\n"
+
+
+@dataclass
+class _Container:
+    kind: str  # "{" or "["
+    start: int  # offset of the opening bracket
+    key: str | int | None = None  # key or index of the value being parsed
+    expecting_key: bool = False
+    values: int = 0
+
+
+@dataclass
+class IncrementalJSONParser:
+    """Parse a JSON document that arrives in chunks, reporting each value the
+    moment its closing character is seen.
+
+    feed() returns (path, value) for every value completed in the chunk whose
+    path is at most max_depth long, innermost first: for '{"a": [1, 2]}' with
+    the default depth that is (("a", 0), 1), (("a", 1), 2) and then
+    (("a",), [1, 2]). Only a single scan over the text is made, values are
+    decoded with json.loads once they are complete.
+    """
+
+    max_depth: int = 2
+    text: str = ""
+    _pos: int = 0
+    _stack: list[_Container] = field(default_factory=list)
+    _in_string: bool = False
+    _escaped: bool = False
+    _token_start: int | None = None  # start of the current string or scalar
+    _string_is_key: bool = False
+
+    def feed(self, chunk: str) -> list[tuple[JSONPath, Any]]:
+        self.text += chunk
+        completed: list[tuple[JSONPath, Any]] = []
+
+        text = self.text
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    token = text[self._token_start : pos + 1]
+                    self._token_start = None
+                    if self._string_is_key:
+                        self._stack[-1].key = json.loads(token)
+                    else:
+                        self._complete(token, completed)
+                continue
+
+            if self._token_start is not None and (char in WHITESPACE or char in ",]}"):
+                # end of a number, true, false or null
+                self._complete(text[self._token_start : pos], completed)
+                self._token_start = None
+
+            if char in WHITESPACE:
+                continue
+            if char in "{[":
+                self._begin_value()
+                self._stack.append(
+                    _Container(kind=char, start=pos, expecting_key=char == "{")
+                )
+                if char == "[":
+                    self._stack[-1].key = 0
+            elif char in "}]":
+                container = self._stack.pop()
+                self._complete(text[container.start : pos + 1], completed)
+            elif char == '"':
+                parent = self._stack[-1] if self._stack else None
+                self._string_is_key = bool(
+                    parent and parent.kind == "{" and parent.expecting_key
+                )
+                if not self._string_is_key:
+                    self._begin_value()
+                self._in_string = True
+                self._token_start = pos
+            elif char == ":":
+                self._stack[-1].expecting_key = False
+            elif char == ",":
+                if self._stack[-1].kind == "{":
+                    self._stack[-1].expecting_key = True
+            elif self._token_start is None:
+                self._begin_value()
+                self._token_start = pos
+
+        self._pos = len(text)
+        return completed
+
+    def result(self) -> Any:
+        """The whole document, once it has been fed completely"""
+        return json.loads(self.text)
+
+    def _begin_value(self) -> None:
+        if self._stack and self._stack[-1].kind == "[":
+            self._stack[-1].key = self._stack[-1].values
+
+    def _complete(self, token: str, completed: list[tuple[JSONPath, Any]]) -> None:
+        if not self._stack:
+            return
+        parent = self._stack[-1]
+        parent.values += 1
+        # a completed value's containers all have their key set by now
+        path = cast(JSONPath, tuple(c.key for c in self._stack))
+        if len(path) <= self.max_depth:
+            completed.append((path, json.loads(token)))
@@ -1,59 +1,215 @@
+"""Logging that never writes to stdout from the event loop.
+
+Loggers hand records to a QueueHandler; a QueueListener thread formats and
+writes them. Records are queued unformatted, so a message's %-args are only
+rendered on the listener thread, and only for records that passed the level
+and sampling filters. Each record carries the id of the request it was logged
+in, see RequestIdMiddleware.
+"""
+
+import atexit
+import json
 import logging
-import logging.config
+import queue
+import random
 import sys
-from typing import Dict, Any
-
-
-def setup_logging(log_level: str = "INFO") -> None:
-    config: Dict[str, Any] = {
-        "version": 1,
-        "disable_existing_loggers": False,
-        "formatters": {
-            "standard": {
-                "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-                "datefmt": "%Y-%m-%d %H:%M:%S",
-            },
-            "json": {
-                "format": '{"timestamp": "%(asctime)s", "level": "%(levelname)s", "logger": "%(name)s", "message": "%(message)s"}',
-                "datefmt": "%Y-%m-%d %H:%M:%S",
-            },
-        },
-        "handlers": {
-            "console": {
-                "class": "logging.StreamHandler",
-                "level": log_level,
-                "formatter": "standard",
-                "stream": sys.stdout,
-            }
-        },
-        "loggers": {
-            "": {
-                "handlers": ["console"],
-                "level": log_level,
-                "propagate": False,
-            },
-            "app": {
-                "handlers": ["console"],
-                "level": log_level,
-                "propagate": False,
-            },
-            "sqlalchemy": {
-                "handlers": ["console"],
-                "level": "WARNING",
-                "propagate": False,
-            },
-        },
-    }
-
-    # Apply the configuration
-    logging.config.dictConfig(config)
-
-
-def setup_production_logging(log_level: str = "INFO") -> None:
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has, anything else was passed with extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: QueueListener | None = None
+_sampling: "SamplingFilter | None" = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id, on the thread that logs"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Thin out high-volume loggers below WARNING.
+
+    sample_rates keeps a random fraction of a logger's records, rate_limits
+    caps them at a number per second (a token bucket with one second of
+    burst). Both are keyed by logger name prefix, the longest matching prefix
+    applies, so "app.data_operations" covers every module under it.
+    """
+
+    def __init__(
+        self,
+        sample_rates: dict[str, float] | None = None,
+        rate_limits: dict[str, float] | None = None,
+    ):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limits = rate_limits or {}
+        self.dropped = 0
+        self._buckets: dict[str, list[float]] = {
+            prefix: [rate, time.monotonic()]
+            for prefix, rate in self.rate_limits.items()
+        }
+        self._prefixes: dict[tuple[str, bool], str | None] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        rate_prefix = self._match(record.name, self.rate_limits)
+        sample_prefix = self._match(record.name, self.sample_rates)
+        keep = True
+        if sample_prefix is not None:
+            keep = random.random() < self.sample_rates[sample_prefix]
+        with self._lock:
+            if keep and rate_prefix is not None:
+                keep = self._take_token(rate_prefix)
+            if not keep:
+                self.dropped += 1
+        return keep
+
+    def stats(self) -> dict[str, Any]:
+        return {"dropped_total": self.dropped}
+
+    def _match(self, name: str, rules: dict[str, float]) -> str | None:
+        key = (name, rules is self.rate_limits)
+        if key not in self._prefixes:
+            matches = [
+                prefix
+                for prefix in rules
+                if name == prefix or name.startswith(prefix + ".") or prefix == ""
+            ]
+            self._prefixes[key] = max(matches, key=len) if matches else None
+        return self._prefixes[key]
+
+    def _take_token(self, prefix: str) -> bool:
+        rate = self.rate_limits[prefix]
+        bucket = self._buckets[prefix]
+        now = time.monotonic()
+        bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with extra= fields as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != "request_id":
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _LazyQueueHandler(QueueHandler):
+    """Queue the record as it is, the listener thread formats it.
+
+    The stock prepare() formats on the caller's thread so the record can be
+    pickled for another process; this queue never leaves the process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(
+    log_level: str = "INFO",
+    json_format: bool = False,
+    sample_rates: dict[str, float] | None = None,
+    rate_limits: dict[str, float] | None = None,
+) -> None:
+    global _listener, _sampling
+    stop_logging()
+
+    console = logging.StreamHandler(sys.stdout)
+    if json_format:
+        console.setFormatter(JsonFormatter())
+    else:
+        console.setFormatter(
+            logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S",
+            )
+        )
+
+    _sampling = SamplingFilter(sample_rates, rate_limits)
+    handler = _LazyQueueHandler(queue.SimpleQueue())
+    handler.setLevel(log_level)
+    handler.addFilter(_sampling)
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(log_level)
+    # app records reach the queue through the root logger
+    logging.getLogger("app").setLevel(log_level)
+    logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+
+    _listener = QueueListener(handler.queue, console, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush what is queued and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def logging_stats() -> dict[str, Any]:
+    return _sampling.stats() if _sampling else {}
+
+
+def setup_production_logging(
+    log_level: str = "INFO",
+    sample_rates: dict[str, float] | None = None,
+    rate_limits: dict[str, float] | None = None,
+) -> None:
     """Set up logging optimized for production environments.
-    Uses JSON format for easy parsing by log aggregation systems.
+    Uses JSON format for easy parsing by log aggregation systems and thins
+    out the high-volume loggers.
     """
-    setup_logging(log_level=log_level)
+    setup_logging(
+        log_level=log_level,
+        json_format=True,
+        sample_rates=sample_rates,
+        rate_limits=rate_limits,
+    )
 
 
 def setup_development_logging(log_level: str = "DEBUG") -> None:
@@ -61,3 +217,39 @@ def setup_development_logging(log_level: str = "DEBUG") -> None:
     Uses human-readable format for easier local debugging.
     """
     setup_logging(log_level=log_level)
+
+
+class RequestIdMiddleware:
+    """Give every HTTP request an id for its log lines.
+
+    A client supplied X-Request-ID is kept so ids can follow a request across
+    services, otherwise a new one is made. It is echoed in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", [])]
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
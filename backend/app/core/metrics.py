@@ -0,0 +1,296 @@
+"""In-process metrics in the Prometheus text format, no client library.
+
+timed() measures a stage as a context manager or a decorator: it feeds the
+stage histogram, the in-flight gauge and the error counter, and adds the
+duration to the Server-Timing header of the request it runs in. Existing
+stats() dicts are exported by registering them as collectors.
+
+Only touched from the event loop, like the rest of the app's counters.
+"""
+
+import functools
+import inspect
+import math
+import time
+from contextvars import ContextVar
+from typing import Any, Callable
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# stage -> (total seconds, count) for the request being handled
+_request_timings: ContextVar[dict[str, list[float]] | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = (*buckets, math.inf)
+        # per label set: a count per bucket (not cumulative), sum
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts, total = self._series.setdefault(
+            labels, ([0] * len(self.buckets), [0.0])
+        )
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        total[0] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    (*self.labelnames, "le"), (*labels, _format_value(bound))
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._collectors: dict[str, Callable[[], dict[str, Any]]] = {}
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self._add(Counter(name, help, tuple(labelnames)))
+
+    def gauge(self, name: str, help: str, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, help, tuple(labelnames)))
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=None):
+        return self._add(
+            Histogram(name, help, tuple(labelnames), buckets or DEFAULT_BUCKETS)
+        )
+
+    def register_collector(
+        self, prefix: str, stats: Callable[[], dict[str, Any]]
+    ) -> None:
+        """Export a stats() dict at scrape time, one series per numeric value.
+
+        Keys ending in _total become counters, everything else gauges; other
+        values (strings, None) are skipped.
+        """
+        self._collectors[prefix] = stats
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+
+        for prefix, stats in self._collectors.items():
+            for key, value in stats().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                kind = "counter" if key.endswith("_total") else "gauge"
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+
+metrics = MetricsRegistry()
+
+stage_seconds = metrics.histogram(
+    "lubezki_stage_seconds", "Duration of an instrumented stage", ["stage"]
+)
+stage_in_flight = metrics.gauge(
+    "lubezki_stage_in_flight", "Instrumented stages currently running", ["stage"]
+)
+stage_errors = metrics.counter(
+    "lubezki_stage_errors_total", "Instrumented stages that raised", ["stage", "error"]
+)
+
+
+class timed:
+    """Time a stage: `with timed("decode"):` or `@timed("db.get_images")`.
+
+    A context manager instance times one stage at a time, create one per use.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._started = 0.0
+
+    def __enter__(self) -> "timed":
+        stage_in_flight.inc(self.stage)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self._started
+        stage_in_flight.dec(self.stage)
+        stage_seconds.observe(elapsed, self.stage)
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            stage_errors.inc(self.stage, exc_type.__name__)
+
+        timings = _request_timings.get()
+        if timings is not None:
+            entry = timings.setdefault(self.stage, [0.0, 0])
+            entry[0] += elapsed
+            entry[1] += 1
+
+    def __call__(self, fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with timed(self.stage):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(self.stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+
+def start_request_timings() -> dict[str, list[float]]:
+    timings: dict[str, list[float]] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: dict[str, list[float]], total: float) -> str:
+    """Server-Timing value, stages that ran more than once are summed"""
+    parts = [
+        (
+            f'{stage};dur={seconds * 1000:.1f};desc="x{count}"'
+            if count > 1
+            else f"{stage};dur={seconds * 1000:.1f}"
+        )
+        for stage, (seconds, count) in timings.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+http_seconds = metrics.histogram(
+    "lubezki_http_request_seconds",
+    "Time to the end of the response",
+    ["method", "route", "status"],
+)
+http_in_flight = metrics.gauge(
+    "lubezki_http_requests_in_flight", "Requests being handled", ["method"]
+)
+
+
+class ServerTimingMiddleware:
+    """Times every HTTP request and reports its stages in Server-Timing.
+
+    The header goes out with the response start, so a streamed response only
+    lists the stages that finished before its first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        timings = start_request_timings()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                value = server_timing_header(timings, time.perf_counter() - started_at)
+                headers = [*message.get("headers", [])]
+                headers.append((b"server-timing", value.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        method = scope["method"]
+        http_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            http_in_flight.dec(method)
+            # the route template, never the raw path, keeps cardinality bounded
+            route = scope.get("route")
+            http_seconds.observe(
+                time.perf_counter() - started_at,
+                method,
+                route.path if route is not None else "unmatched",
+                str(status),
+            )
@@ -0,0 +1,5 @@
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+# the app's only limiter: per client IP, counted in process memory
+limiter = Limiter(key_func=get_remote_address)
@@ -0,0 +1,39 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+
+from app.core.config import settings
+
+
+def _signing_key() -> bytes:
+    # derived, so a token never carries anything that would open the admin API
+    secret = settings.TOKEN_SECRET or settings.API_KEY
+    return hmac.new(secret.encode(), b"lubezki-token", hashlib.sha256).digest()
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(_signing_key(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def issue_token(scope: str, ttl_seconds: int) -> str:
+    """A signed "scope.expires.nonce.signature" token, good for one scope only
+    until it expires. Stateless, any process with the same secret accepts it."""
+    payload = f"{scope}.{int(time.time()) + ttl_seconds}.{secrets.token_urlsafe(8)}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token: str, scope: str) -> bool:
+    try:
+        payload, signature = token.rsplit(".", 1)
+        token_scope, expires, _ = payload.split(".")
+        expires_at = int(expires)
+    except ValueError:
+        return False
+    return (
+        hmac.compare_digest(signature, _sign(payload))
+        and token_scope == scope
+        and expires_at > time.time()
+    )
@@ -1,28 +1,100 @@
 # Data operations for the application
 from .basic_images import (
     create_image,
+    decode_gallery_cursor,
+    encode_gallery_cursor,
     get_image_by_id,
+    get_image_hashes,
+    get_image_with_items,
     get_images,
+    update_image_analysis,
+    update_image_status,
 )
 from .items import (
     create_item,
+    create_items_bulk,
     get_item,
     get_items_for_image,
+    search_items,
+)
+
+from .jobs import (
+    claim_job,
+    complete_job,
+    create_pending_image,
+    delete_stale_uploads,
+    finalize_uploaded_image,
+    get_job,
+    get_latest_job_for_image,
+    get_unfinished_jobs,
+    requeue_stale_jobs,
+    set_job_status,
+)
+
+from .derivatives import (
+    create_derivatives,
+    get_derivatives_for_images,
+)
+
+from .analysis_cache import (
+    get_cached_analysis,
+    prune_cached_analyses,
+    store_cached_analysis,
 )
 
 from .basic_bucket import (
+    delete_file,
+    download_file,
+    head_file,
+    presign_upload,
+    upload_bytes,
     upload_file,
+    upload_many,
+    upload_stream,
 )
 
 __all__ = [
     # Image database operations
     "create_image",
+    "decode_gallery_cursor",
+    "encode_gallery_cursor",
     "get_image_by_id",
+    "get_image_hashes",
+    "get_image_with_items",
     "get_images",
+    "update_image_analysis",
+    "update_image_status",
     # Item database operations
     "create_item",
+    "create_items_bulk",
     "get_item",
     "get_items_for_image",
-    # Item database operations
+    "search_items",
+    # Job database operations
+    "claim_job",
+    "complete_job",
+    "create_pending_image",
+    "delete_stale_uploads",
+    "finalize_uploaded_image",
+    "get_job",
+    "get_latest_job_for_image",
+    "get_unfinished_jobs",
+    "requeue_stale_jobs",
+    "set_job_status",
+    # Derivative database operations
+    "create_derivatives",
+    "get_derivatives_for_images",
+    # Analysis cache database operations
+    "get_cached_analysis",
+    "prune_cached_analyses",
+    "store_cached_analysis",
+    # Bucket operations
+    "delete_file",
+    "download_file",
+    "head_file",
+    "presign_upload",
+    "upload_bytes",
     "upload_file",
+    "upload_many",
+    "upload_stream",
 ]
@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.model_definitions import AnalysisCacheEntries
+from app.core.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+@timed("db.get_cached_analysis")
+async def get_cached_analysis(
+    session: AsyncSession, cache_key: str, max_age_seconds: int
+) -> dict[str, Any] | None:
+    """Get a stored analysis response, expired entries are deleted and ignored"""
+    entry = await session.get(AnalysisCacheEntries, cache_key)
+    if not entry:
+        return None
+
+    if entry.created_at < datetime.now() - timedelta(seconds=max_age_seconds):
+        await session.delete(entry)
+        await session.commit()
+        return None
+
+    entry.hit_count += 1
+    entry.last_used_at = datetime.now()
+    await session.commit()
+    return entry.response
+
+
+@timed("db.store_cached_analysis")
+async def store_cached_analysis(
+    session: AsyncSession, cache_key: str, model: str, response: dict[str, Any]
+) -> None:
+    logger.info("Caching analysis %s for model %s", cache_key[:12], model)
+
+    await session.merge(
+        AnalysisCacheEntries(
+            cache_key=cache_key,
+            model=model,
+            response=response,
+            created_at=datetime.now(),
+            last_used_at=datetime.now(),
+        )
+    )
+    await session.commit()
+
+
+@timed("db.prune_cached_analyses")
+async def prune_cached_analyses(
+    session: AsyncSession, max_age_seconds: int, max_rows: int
+) -> None:
+    """Drop expired entries, then the least recently used ones beyond max_rows"""
+    cutoff = datetime.now() - timedelta(seconds=max_age_seconds)
+    await session.execute(
+        delete(AnalysisCacheEntries).where(AnalysisCacheEntries.created_at < cutoff)
+    )
+
+    # last_used_at of the first entry past the cap, it and everything older goes
+    threshold = await session.scalar(
+        select(AnalysisCacheEntries.last_used_at)
+        .order_by(AnalysisCacheEntries.last_used_at.desc())
+        .offset(max_rows)
+        .limit(1)
+    )
+    if threshold is not None:
+        await session.execute(
+            delete(AnalysisCacheEntries).where(
+                AnalysisCacheEntries.last_used_at <= threshold
+            )
+        )
+    await session.commit()
@@ -1,28 +1,198 @@
+import asyncio
 import logging
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from functools import partial
+from typing import Any, BinaryIO, cast
 import uuid
 from PIL import Image
 import io
 
 from app.core.config import settings
+from app.core.metrics import timed
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
-s3_client = boto3.client("s3")
 
+# files above the threshold go up as a multipart upload, read chunk by chunk
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
 
+
+class S3Storage:
+    """Non-blocking wrapper around a pooled boto3 S3 client.
+
+    boto3 is synchronous, so calls run on a dedicated thread pool sized to the
+    client's connection pool; the event loop only awaits them. endpoint_url
+    points the client at any S3-compatible service (MinIO, moto server) for
+    local runs, tests and benchmarks.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        public_url: str,
+        endpoint_url: str | None = None,
+        max_connections: int = 32,
+    ):
+        self.bucket = bucket
+        self.public_url = public_url
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            config=Config(
+                max_pool_connections=max_connections,
+                retries={"max_attempts": 3, "mode": "standard"},
+            ),
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_connections, thread_name_prefix="s3"
+        )
+
+    async def _run(self, fn, /, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, **kwargs))
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_url}{key}"
+
+    async def put(self, data: bytes, content_type: str, key: str | None = None) -> str:
+        key = key or str(uuid.uuid4())
+        await self._run(
+            self._client.put_object,
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+        )
+        return key
+
+    async def put_stream(
+        self, fileobj: BinaryIO, content_type: str, key: str | None = None
+    ) -> str:
+        """Stream a file object to the bucket without loading it into memory"""
+        key = key or str(uuid.uuid4())
+        await self._run(
+            self._client.upload_fileobj,
+            Fileobj=fileobj,
+            Bucket=self.bucket,
+            Key=key,
+            ExtraArgs={"ContentType": content_type},
+            Config=TRANSFER_CONFIG,
+        )
+        return key
+
+    async def put_many(self, objects: list[tuple[bytes, str]]) -> list[str]:
+        """Upload (data, content_type) pairs concurrently, keys in input order"""
+        return list(
+            await asyncio.gather(
+                *(self.put(data, content_type) for data, content_type in objects)
+            )
+        )
+
+    async def get(self, key: str) -> bytes:
+        def _get() -> bytes:
+            response = self._client.get_object(Bucket=self.bucket, Key=key)
+            return response["Body"].read()
+
+        return await self._run(_get)
+
+    async def head(self, key: str) -> dict[str, Any] | None:
+        """Size and content type of an object, None if it does not exist"""
+
+        def _head() -> dict[str, Any] | None:
+            try:
+                response = self._client.head_object(Bucket=self.bucket, Key=key)
+                return cast(dict[str, Any], response)
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                    return None
+                raise
+
+        return await self._run(_head)
+
+    def presigned_post(
+        self, key: str, content_type: str, max_bytes: int, expires_seconds: int
+    ) -> dict[str, Any]:
+        """Form fields for a browser upload straight to the bucket, accepted
+        only for this key and content type and at most max_bytes. Signing is
+        local, no request is made.
+        """
+        return self._client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_bytes],
+            ],
+            ExpiresIn=expires_seconds,
+        )
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._client.delete_object, Bucket=self.bucket, Key=key)
+
+
+storage = S3Storage(
+    bucket=settings.AWS_BASIC_BUCKET_NAME,
+    public_url=settings.AWS_PUBLIC_BUCKET_URL,
+    endpoint_url=settings.AWS_ENDPOINT_URL,
+    max_connections=settings.S3_MAX_POOL_CONNECTIONS,
+)
+
+
+@timed("storage.upload_file")
 async def upload_file(file: Image.Image) -> str:
-    key = str(uuid.uuid4())
     in_memory_file = io.BytesIO()
     file.save(in_memory_file, format="JPEG")
-    in_memory_file.seek(0)
+    return await storage.put(in_memory_file.getvalue(), "image/jpeg")
+
+
+@timed("storage.upload_bytes")
+async def upload_bytes(data: bytes, content_type: str) -> str:
+    """Upload already-encoded bytes as-is, without decoding or re-encoding"""
+    return await storage.put(data, content_type)
+
+
+@timed("storage.upload_stream")
+async def upload_stream(fileobj: BinaryIO, content_type: str) -> str:
+    """Upload the original exactly as received, multipart when it is large"""
+    return await storage.put_stream(fileobj, content_type)
+
+
+@timed("storage.upload_many")
+async def upload_many(objects: list[tuple[bytes, str]]) -> list[str]:
+    return await storage.put_many(objects)
+
+
+@timed("storage.download_file")
+async def download_file(key: str) -> bytes:
+    return await storage.get(key)
+
+
+@timed("storage.head_file")
+async def head_file(key: str) -> dict[str, Any] | None:
+    return await storage.head(key)
+
+
+@timed("storage.delete_file")
+async def delete_file(key: str) -> None:
+    await storage.delete(key)
+
 
-    s3_client.put_object(
-        Bucket=settings.AWS_BASIC_BUCKET_NAME,
-        Key=key,
-        Body=in_memory_file,
-        ContentType=f"image/{file.format}",
+def presign_upload(key: str, content_type: str = "image/jpeg") -> dict[str, Any]:
+    """Presigned POST for a direct upload, see S3Storage.presigned_post"""
+    return storage.presigned_post(
+        key,
+        content_type,
+        max_bytes=settings.DIRECT_UPLOAD_MAX_BYTES,
+        expires_seconds=settings.DIRECT_UPLOAD_EXPIRES_SECONDS,
     )
-    return key
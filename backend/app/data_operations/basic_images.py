@@ -1,15 +1,20 @@
-from typing import Sequence
+from typing import Sequence, cast
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Row, literal, select, tuple_
+from sqlalchemy.orm import joinedload
+import base64
 import logging
 import uuid
+from datetime import datetime
 
-from app.schemas.image import ImageInTable
+from app.schemas.image import ImageInTable, ImageAnalysisUpdate, ImageUploadUpdate
 from app.models.model_definitions import Images
+from app.core.metrics import timed
 
 logger = logging.getLogger(__name__)
 
 
+@timed("db.create_image")
 async def create_image(
     session: AsyncSession, image_data: ImageInTable
 ) -> Images | None:
@@ -20,21 +25,140 @@ async def create_image(
     session.add(db_image)
     await session.commit()
     await session.refresh(db_image)
-    logger.info(f"Successfully created image with ID: {db_image.image_id}")
+    logger.info("Successfully created image with ID: %s", db_image.image_id)
     return db_image
 
 
-async def get_images(session: AsyncSession) -> Sequence[Images]:
-    """Get all images from the database"""
-    logger.info("Getting all gallery images from the database")
+# only what a gallery tile needs, analysis and score stay in the database
+GALLERY_COLUMNS = (
+    Images.image_id,
+    Images.created_at,
+    Images.storage_key,
+    Images.thumbnail_key,
+    Images.width_px,
+    Images.height_px,
+    Images.thumbnail_width_px,
+    Images.thumbnail_height_px,
+)
 
-    result = await session.scalars(select(Images))
-    return result.all()
 
+def encode_gallery_cursor(created_at: datetime, image_id: uuid.UUID) -> str:
+    """Opaque cursor pointing just after (created_at, image_id)"""
+    raw = f"{created_at.isoformat()}|{image_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
 
+
+def decode_gallery_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Inverse of encode_gallery_cursor, raises ValueError for a malformed cursor"""
+    try:
+        created_at, image_id = base64.urlsafe_b64decode(cursor).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(image_id)
+    except (TypeError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+@timed("db.get_images")
+async def get_images(
+    session: AsyncSession, limit: int, cursor: str | None = None
+) -> tuple[Sequence[Row], str | None]:
+    """Get one page of completed images, newest first, and the next page's cursor.
+
+    Keyset pagination on (created_at, image_id): each page seeks straight to
+    its position in ix_images_gallery, so page 1000 costs the same as page 1.
+    image_id breaks ties between images created in the same instant.
+    """
+    logger.info("Getting gallery page of %s images", limit)
+
+    query = (
+        select(*GALLERY_COLUMNS)
+        .where(Images.status == "complete")
+        .order_by(Images.created_at.desc(), Images.image_id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        created_at, image_id = decode_gallery_cursor(cursor)
+        query = query.where(
+            tuple_(Images.created_at, Images.image_id)
+            < tuple_(literal(created_at), literal(image_id))
+        )
+
+    rows = (await session.execute(query)).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_gallery_cursor(rows[-1].created_at, rows[-1].image_id)
+
+
+@timed("db.get_image_hashes")
+async def get_image_hashes(session: AsyncSession) -> Sequence[tuple[uuid.UUID, int]]:
+    """Get (image_id, phash) for every completed image that has a hash"""
+    logger.info("Getting perceptual hashes of gallery images")
+
+    result = await session.execute(
+        select(Images.image_id, Images.phash).where(
+            Images.status == "complete", Images.phash.is_not(None)
+        )
+    )
+    # phash is nullable, but the query leaves the NULLs out
+    return cast(Sequence[tuple[uuid.UUID, int]], result.tuples().all())
+
+
+@timed("db.get_image_by_id")
 async def get_image_by_id(session: AsyncSession, image_id: str) -> Images | None:
     """Get an image by its ID"""
-    logger.info(f"Getting image with ID: {image_id}")
+    logger.info("Getting image with ID: %s", image_id)
     image_uuid = uuid.UUID(image_id)
     result = await session.get(Images, image_uuid)
     return result
+
+
+@timed("db.get_image_with_items")
+async def get_image_with_items(
+    session: AsyncSession, image_id: uuid.UUID
+) -> Images | None:
+    """Get an image and its items in one query, items eagerly joined"""
+    logger.info("Getting image with items for ID: %s", image_id)
+
+    result = await session.scalars(
+        select(Images)
+        .where(Images.image_id == image_id)
+        .options(joinedload(Images.items))
+    )
+    return result.unique().one_or_none()
+
+
+@timed("db.update_image_status")
+async def update_image_status(
+    session: AsyncSession, update: ImageUploadUpdate
+) -> Images | None:
+    """Update an image's processing status and any thumbnail fields provided"""
+    logger.info("Setting status of image %s to %s", update.image_id, update.status)
+
+    db_image = await session.get(Images, update.image_id)
+    if not db_image:
+        return None
+
+    changes = update.model_dump(exclude={"image_id"}, exclude_none=True)
+    for field, value in changes.items():
+        setattr(db_image, field, value)
+    db_image.updated_at = datetime.now()
+    await session.commit()
+    return db_image
+
+
+@timed("db.update_image_analysis")
+async def update_image_analysis(
+    session: AsyncSession, update: ImageAnalysisUpdate
+) -> Images | None:
+    """Store the analysis result for an image"""
+    logger.info("Saving analysis for image %s", update.image_id)
+
+    db_image = await session.get(Images, update.image_id)
+    if not db_image:
+        return None
+
+    for field, value in update.model_dump(exclude={"image_id"}).items():
+        setattr(db_image, field, value)
+    await session.commit()
+    return db_image
@@ -0,0 +1,52 @@
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Row, insert, select
+from typing import Sequence
+import uuid
+
+from app.models.model_definitions import ImageDerivatives
+from app.schemas.image import ImageDerivativeCreate
+from app.core.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+@timed("db.create_derivatives")
+async def create_derivatives(
+    session: AsyncSession,
+    derivatives: Sequence[ImageDerivativeCreate],
+    commit: bool = True,
+) -> None:
+    """Insert all derivatives in one multi-row INSERT"""
+    if not derivatives:
+        return
+    logger.info("Recording %s derivatives", len(derivatives))
+
+    await session.execute(
+        insert(ImageDerivatives),
+        [derivative.model_dump() for derivative in derivatives],
+    )
+    if commit:
+        await session.commit()
+
+
+@timed("db.get_derivatives_for_images")
+async def get_derivatives_for_images(
+    session: AsyncSession, image_ids: Sequence[uuid.UUID]
+) -> Sequence[Row]:
+    """Get the derivatives of several images, ascending width within each image"""
+    if not image_ids:
+        return []
+
+    result = await session.execute(
+        select(
+            ImageDerivatives.image_id,
+            ImageDerivatives.storage_key,
+            ImageDerivatives.format,
+            ImageDerivatives.width_px,
+            ImageDerivatives.height_px,
+        )
+        .where(ImageDerivatives.image_id.in_(image_ids))
+        .order_by(ImageDerivatives.width_px, ImageDerivatives.format)
+    )
+    return result.all()
@@ -1,21 +1,40 @@
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Sequence
+from sqlalchemy import (
+    ColumnClause,
+    Row,
+    func,
+    insert,
+    literal,
+    literal_column,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.types import Float
+from typing import Any, Sequence
 import uuid
 
-from app.models.model_definitions import Items
-from app.schemas.item import ItemCreate
+from app.data_operations.basic_images import (
+    decode_gallery_cursor,
+    encode_gallery_cursor,
+)
+from app.models.model_definitions import Images, Items
+from app.schemas.item import ItemBulkCreate, ItemCreate, ItemSearchQuery
+from app.core.metrics import timed
 
 logger = logging.getLogger(__name__)
 
 
+@timed("db.get_item")
 async def get_item(session: AsyncSession, item_id: uuid.UUID) -> Items | None:
-    logger.info(f"Fetching item with ID: {item_id}")
+    logger.info("Fetching item with ID: %s", item_id)
 
     return await session.get(Items, item_id)
 
 
+@timed("db.create_item")
 async def create_item(session: AsyncSession, item: ItemCreate) -> Items | None:
     logger.info("Creating new item")
 
@@ -23,16 +42,163 @@ async def create_item(session: AsyncSession, item: ItemCreate) -> Items | None:
     session.add(db_item)
     await session.commit()
     await session.refresh(db_item)
-    logger.info(f"Successfully created item with ID: {db_item.item_id}")
+    logger.info("Successfully created item with ID: %s", db_item.item_id)
     return db_item
 
 
+@timed("db.create_items_bulk")
+async def create_items_bulk(
+    session: AsyncSession, bulk: ItemBulkCreate, commit: bool = True
+) -> list[uuid.UUID]:
+    """Insert every item with one multi-row INSERT ... RETURNING item_id.
+
+    With commit=False the caller owns the transaction.
+    """
+    if not bulk.items:
+        return []
+    logger.info("Creating %s items for image %s", len(bulk.items), bulk.image_id)
+
+    rows = [
+        {"item_id": uuid.uuid4(), **item.model_dump(), "image_id": bulk.image_id}
+        for item in bulk.items
+    ]
+    result = await session.execute(insert(Items).returning(Items.item_id), rows)
+    item_ids = list(result.scalars().all())
+    if commit:
+        await session.commit()
+    return item_ids
+
+
+@timed("db.get_items_for_image")
 async def get_items_for_image(
     session: AsyncSession, image_id: str
 ) -> tuple[Sequence[Items], int]:
-    logger.info(f"Fetching items for image {image_id}")
+    logger.info("Fetching items for image %s", image_id)
 
     items_stmt = select(Items).where(Items.image_id == uuid.UUID(image_id))
     items = (await session.scalars(items_stmt)).all()
-    logger.info(f"Retrieved {len(items)} items for image {image_id}")
+    logger.info("Retrieved %s items for image %s", len(items), image_id)
     return items, len(items)
+
+
+# generated columns added by migrations.search_indexes, not mapped on the models
+ITEM_SEARCH_VECTOR = literal_column("items.search_vector", TSVECTOR)
+ITEM_BOX: ColumnClause[Any] = literal_column("items.box")
+ITEM_BOX_AREA: ColumnClause[float] = literal_column("items.box_area", Float)
+IMAGE_SEARCH_VECTOR = literal_column("images.search_vector", TSVECTOR)
+
+
+class SearchUnavailable(Exception):
+    """The database can't serve item search"""
+
+
+_search_ready = False
+
+
+async def _check_search_ready(session: AsyncSession) -> None:
+    """Raise SearchUnavailable until migrations.search_indexes has run, the
+    answer is remembered once it has"""
+    global _search_ready
+    if _search_ready:
+        return
+    if session.get_bind().dialect.name != "postgresql":
+        raise SearchUnavailable("Item search needs PostgreSQL")
+    found = await session.scalar(
+        text(
+            "SELECT count(*) FROM information_schema.columns"
+            " WHERE table_schema = current_schema()"
+            # the last column the migration adds
+            " AND table_name = 'images' AND column_name = 'search_vector'"
+        )
+    )
+    if not found:
+        raise SearchUnavailable(
+            "Item search is not set up, run python -m migrations.search_indexes"
+        )
+    _search_ready = True
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@timed("db.search_items")
+async def search_items(
+    session: AsyncSession,
+    search: ItemSearchQuery,
+    limit: int,
+    cursor: str | None = None,
+) -> tuple[Sequence[Row], str | None]:
+    """Get one page of items of completed images matching every given filter,
+    newest first, and the next page's cursor.
+
+    Each filter has its own index: websearch_to_tsquery over the GIN indexed
+    search_vector columns, ILIKE on the name (through pg_trgm when it is
+    installed), && or <@ on the GiST indexed box, a range on box_area. Pages
+    use keyset pagination on (created_at, item_id) like the gallery. Needs
+    PostgreSQL with migrations.search_indexes applied, raises
+    SearchUnavailable otherwise.
+    """
+    await _check_search_ready(session)
+    logger.info("Searching items, page of %s", limit)
+
+    query = (
+        select(
+            Items.item_id,
+            Items.image_id,
+            Items.name,
+            Items.bounding_box,
+            Items.analysis,
+            Items.is_positive,
+            Items.created_at,
+            Images.storage_key,
+            Images.thumbnail_key,
+        )
+        .join(Images, Images.image_id == Items.image_id)
+        .where(Images.status == "complete")
+        .order_by(Items.created_at.desc(), Items.item_id.desc())
+        .limit(limit + 1)
+    )
+
+    if search.text:
+        query = query.where(
+            ITEM_SEARCH_VECTOR.bool_op("@@")(
+                func.websearch_to_tsquery("english", search.text)
+            )
+        )
+    if search.image_text:
+        query = query.where(
+            IMAGE_SEARCH_VECTOR.bool_op("@@")(
+                func.websearch_to_tsquery("english", search.image_text)
+            )
+        )
+    if search.name:
+        query = query.where(
+            Items.name.ilike(f"%{_escape_like(search.name)}%", escape="\\")
+        )
+    if search.is_positive is not None:
+        query = query.where(Items.is_positive == search.is_positive)
+    if search.region:
+        region = func.box(
+            func.point(float(search.region.x_min), float(search.region.y_min)),
+            func.point(float(search.region.x_max), float(search.region.y_max)),
+        )
+        operator = "&&" if search.region_mode == "overlaps" else "<@"
+        query = query.where(ITEM_BOX.bool_op(operator)(region))
+    if search.min_area is not None:
+        query = query.where(ITEM_BOX_AREA >= search.min_area)
+    if search.max_area is not None:
+        query = query.where(ITEM_BOX_AREA <= search.max_area)
+    if cursor:
+        created_at, item_id = decode_gallery_cursor(cursor)
+        query = query.where(
+            tuple_(Items.created_at, Items.item_id)
+            < tuple_(literal(created_at), literal(item_id))
+        )
+
+    rows = (await session.execute(query)).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_gallery_cursor(rows[-1].created_at, rows[-1].item_id)
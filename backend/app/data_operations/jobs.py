@@ -0,0 +1,259 @@
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, select, update
+from typing import Sequence
+import uuid
+from datetime import datetime
+
+from app.data_operations.derivatives import create_derivatives
+from app.data_operations.items import create_items_bulk
+from app.models.model_definitions import AnalysisJobs, Images
+from app.schemas.image import (
+    ImageAnalysisUpdate,
+    ImageDerivativeCreate,
+    ImageInTable,
+    ImageUploadUpdate,
+)
+from app.schemas.item import ItemBulkCreate
+from app.core.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+@timed("db.create_pending_image")
+async def create_pending_image(
+    session: AsyncSession,
+    image_data: ImageInTable,
+    source_key: str,
+    duplicate_policy: str = "analyze",
+) -> AnalysisJobs:
+    """Create a pending image and its analysis job in one transaction"""
+    logger.info("Creating pending image and analysis job")
+
+    db_image = Images(**image_data.model_dump())
+    db_job = AnalysisJobs(
+        image_id=image_data.image_id,
+        source_key=source_key,
+        duplicate_policy=duplicate_policy,
+    )
+    session.add_all([db_image, db_job])
+    await session.commit()
+    logger.info("Queued analysis job %s for image %s", db_job.job_id, db_image.image_id)
+    return db_job
+
+
+@timed("db.finalize_uploaded_image")
+async def finalize_uploaded_image(
+    session: AsyncSession,
+    image_id: uuid.UUID,
+    source_key: str,
+    size_bytes: int,
+    duplicate_policy: str = "analyze",
+) -> AnalysisJobs | None:
+    """Mark a directly uploaded image pending and create its analysis job in
+    one transaction. Returns None if the image is no longer waiting for its
+    upload, so finalizing twice never queues two jobs.
+    """
+    logger.info("Finalizing direct upload of image %s", image_id)
+
+    result = await session.execute(
+        update(Images)
+        .where(Images.image_id == image_id, Images.status == "uploading")
+        .values(status="pending", size_bytes=size_bytes, updated_at=datetime.now())
+    )
+    if result.rowcount == 0:
+        await session.rollback()
+        return None
+
+    db_job = AnalysisJobs(
+        image_id=image_id, source_key=source_key, duplicate_policy=duplicate_policy
+    )
+    session.add(db_job)
+    await session.commit()
+    logger.info("Queued analysis job %s for image %s", db_job.job_id, image_id)
+    return db_job
+
+
+@timed("db.delete_stale_uploads")
+async def delete_stale_uploads(
+    session: AsyncSession, created_before: datetime, limit: int = 500
+) -> Sequence[uuid.UUID]:
+    """Delete direct uploads still waiting to be finalized that were created
+    before created_before, returns their ids. An upload finalized meanwhile is
+    left alone, like finalize_uploaded_image this only touches "uploading"
+    rows.
+    """
+    stale = (
+        await session.scalars(
+            select(Images.image_id)
+            .where(Images.status == "uploading", Images.created_at < created_before)
+            .limit(limit)
+        )
+    ).all()
+    if not stale:
+        return []
+
+    deleted = (
+        await session.scalars(
+            delete(Images)
+            .where(Images.image_id.in_(stale), Images.status == "uploading")
+            .returning(Images.image_id)
+        )
+    ).all()
+    await session.commit()
+    logger.info("Deleted %s abandoned direct uploads", len(deleted))
+    return deleted
+
+
+@timed("db.get_job")
+async def get_job(session: AsyncSession, job_id: uuid.UUID) -> AnalysisJobs | None:
+    return await session.get(AnalysisJobs, job_id)
+
+
+@timed("db.get_latest_job_for_image")
+async def get_latest_job_for_image(
+    session: AsyncSession, image_id: str
+) -> AnalysisJobs | None:
+    logger.info("Fetching latest analysis job for image %s", image_id)
+
+    stmt = (
+        select(AnalysisJobs)
+        .where(AnalysisJobs.image_id == uuid.UUID(image_id))
+        .order_by(AnalysisJobs.created_at.desc())
+        .limit(1)
+    )
+    return (await session.scalars(stmt)).first()
+
+
+@timed("db.get_unfinished_jobs")
+async def get_unfinished_jobs(
+    session: AsyncSession, updated_before: datetime | None = None
+) -> Sequence[AnalysisJobs]:
+    """Queued jobs, oldest first. With updated_before only those untouched
+    since, anything newer is most likely still in some process's queue."""
+    stmt = (
+        select(AnalysisJobs)
+        .where(AnalysisJobs.status == "queued")
+        .order_by(AnalysisJobs.created_at)
+    )
+    if updated_before is not None:
+        stmt = stmt.where(AnalysisJobs.updated_at < updated_before)
+    return (await session.scalars(stmt)).all()
+
+
+@timed("db.requeue_stale_jobs")
+async def requeue_stale_jobs(session: AsyncSession, updated_before: datetime) -> int:
+    """Put running jobs untouched since updated_before back in the queue, the
+    process that claimed them is taken to have died. Returns how many."""
+    requeued = (
+        await session.scalars(
+            update(AnalysisJobs)
+            .where(
+                AnalysisJobs.status == "running",
+                AnalysisJobs.updated_at < updated_before,
+            )
+            .values(status="queued", updated_at=datetime.now())
+            .returning(AnalysisJobs.job_id)
+        )
+    ).all()
+    await session.commit()
+    if requeued:
+        logger.info("Re-queued %s stale running analysis jobs", len(requeued))
+    return len(requeued)
+
+
+@timed("db.claim_job")
+async def claim_job(session: AsyncSession, job_id: uuid.UUID) -> AnalysisJobs | None:
+    """Move a queued job to running and count the attempt, in one statement.
+
+    Several processes may hold the same job id in their queues, only the one
+    whose update still finds it queued gets the row back; the others get None
+    and must skip it.
+    """
+    db_job = (
+        await session.scalars(
+            update(AnalysisJobs)
+            .where(AnalysisJobs.job_id == job_id, AnalysisJobs.status == "queued")
+            .values(
+                status="running",
+                attempts=AnalysisJobs.attempts + 1,
+                error=None,
+                updated_at=datetime.now(),
+            )
+            .returning(AnalysisJobs)
+        )
+    ).one_or_none()
+    await session.commit()
+    return db_job
+
+
+@timed("db.set_job_status")
+async def set_job_status(
+    session: AsyncSession,
+    job_id: uuid.UUID,
+    status: str,
+    error: str | None = None,
+    increment_attempts: bool = False,
+    duplicate_of: uuid.UUID | None = None,
+) -> AnalysisJobs | None:
+    db_job = await session.get(AnalysisJobs, job_id)
+    if not db_job:
+        return None
+
+    db_job.status = status
+    db_job.error = error
+    db_job.updated_at = datetime.now()
+    if duplicate_of:
+        db_job.duplicate_of = duplicate_of
+    if increment_attempts:
+        db_job.attempts += 1
+    await session.commit()
+    return db_job
+
+
+@timed("db.complete_job")
+async def complete_job(
+    session: AsyncSession,
+    job_id: uuid.UUID,
+    upload: ImageUploadUpdate,
+    analysis: ImageAnalysisUpdate,
+    items: ItemBulkCreate,
+    derivatives: Sequence[ImageDerivativeCreate],
+    duplicate_of: uuid.UUID | None = None,
+) -> list[uuid.UUID] | None:
+    """Write a finished analysis in one transaction.
+
+    The image update, the multi-row item and derivative inserts and the job
+    update either all land or none do, so a retried job never leaves
+    duplicate items behind. Returns the new item ids, or None without writing
+    anything when the job is no longer running (it was re-queued as stale and
+    another worker owns it now).
+    """
+    logger.info("Completing analysis job %s for image %s", job_id, upload.image_id)
+
+    completed = await session.scalar(
+        update(AnalysisJobs)
+        .where(AnalysisJobs.job_id == job_id, AnalysisJobs.status == "running")
+        .values(
+            status="complete",
+            error=None,
+            duplicate_of=duplicate_of,
+            updated_at=datetime.now(),
+        )
+        .returning(AnalysisJobs.job_id)
+    )
+    if completed is None:
+        await session.rollback()
+        return None
+
+    image_values = {
+        **upload.model_dump(exclude={"image_id"}, exclude_none=True),
+        **analysis.model_dump(exclude={"image_id"}),
+    }
+    await session.execute(
+        update(Images).where(Images.image_id == upload.image_id).values(image_values)
+    )
+    item_ids = await create_items_bulk(session, items, commit=False)
+    await create_derivatives(session, derivatives, commit=False)
+    await session.commit()
+    return item_ids
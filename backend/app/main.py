@@ -1,45 +1,74 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 from contextlib import asynccontextmanager
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from app.api import api_router
+from app.api.deps import verify_api_key
+from app.api.basic import (
+    analysis_admission,
+    analysis_pool,
+    analyzer,
+    image_detail_cache,
+)
+from app.core.admission import Overloaded
+from app.services.duplicate_index import duplicate_index
+from app.services.gallery_cache import gallery_cache
+from app.services.image_processing import image_processor
+from app.services.realtime import FramingSession
 from app.core.config import settings
 from app.core.database_async import session_manager
-from app.core.logging_config import setup_logging
-
+from app.core.logging_config import (
+    RequestIdMiddleware,
+    logging_stats,
+    setup_development_logging,
+    setup_production_logging,
+)
+from app.core.metrics import ServerTimingMiddleware, metrics
+from app.core.rate_limit import limiter
 
 # Set up logging based on environment
-
-setup_logging(log_level="INFO")
+if settings.env == "dev":
+    setup_development_logging(settings.log_level)
+else:
+    setup_production_logging(
+        settings.log_level, settings.LOG_SAMPLE_RATES, settings.LOG_RATE_LIMITS
+    )
 
 logger = logging.getLogger(__name__)
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
         if await session_manager.health_check():
             logger.info("Database connection established")
+            await session_manager.warm_up()
         else:
             logger.error("Database health check failed")
     except Exception as e:
-        logger.error(f"Database connection failed: {e}")
+        logger.error("Database connection failed: %s", e)
         raise
 
+    await session_manager.create_tables()
+    await duplicate_index.rebuild()
+    image_processor.start()
+    await analysis_pool.start()
+
     yield
 
+    await analysis_pool.stop()
+    await analyzer.close()
+    image_processor.shutdown()
+
     try:
         await session_manager.close()
         logger.info("Database connection closed")
     except Exception as e:
-        logger.error(f"Error closing database connection: {e}")
+        logger.error("Error closing database connection: %s", e)
 
 
 app = FastAPI(
@@ -54,6 +83,17 @@ app = FastAPI(
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+
+# Analysis requests turned away by admission control
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, try again later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # Set up CORS
 app.add_middleware(
     CORSMiddleware,
@@ -67,23 +107,52 @@ app.add_middleware(
         "Content-Type",
         "Authorization",
         "X-Requested-With",
+        "X-Request-ID",
         "Origin",
         "Access-Control-Request-Method",
         "Access-Control-Request-Headers",
     ],
-    expose_headers=["Content-Length", "Content-Range"],
+    expose_headers=[
+        "Content-Length",
+        "Content-Range",
+        "Server-Timing",
+        "X-Request-ID",
+    ],
     max_age=86400,
 )
 
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_STR)
 
+# Existing stats, read when /metrics is scraped
+metrics.register_collector("lubezki_db_pool", session_manager.pool_stats)
+metrics.register_collector("lubezki_analyzer", analyzer.stats)
+if hasattr(analyzer, "cache"):
+    metrics.register_collector("lubezki_analysis_cache", analyzer.cache.stats)
+metrics.register_collector("lubezki_analysis_queue", analysis_pool.stats)
+metrics.register_collector("lubezki_admission", analysis_admission.stats)
+metrics.register_collector("lubezki_gallery_cache", gallery_cache.stats)
+metrics.register_collector("lubezki_image_detail_cache", image_detail_cache.stats)
+metrics.register_collector("lubezki_logging", logging_stats)
+metrics.register_collector(
+    "lubezki_realtime", lambda: {"sessions": FramingSession.active}
+)
+
 
 @app.get("/")
 async def root():
     return {"message": "Lubezki API is running!"}
 
 
+# scrape with the API key as an X-API-Key header (http_headers in Prometheus)
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(verify_api_key)])
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
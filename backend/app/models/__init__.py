@@ -1,3 +1,15 @@
-from .model_definitions import Images, Items
+from .model_definitions import (
+    Images,
+    Items,
+    ImageDerivatives,
+    AnalysisJobs,
+    AnalysisCacheEntries,
+)
 
-__all__ = ["Images", "Items"]
+__all__ = [
+    "Images",
+    "Items",
+    "ImageDerivatives",
+    "AnalysisJobs",
+    "AnalysisCacheEntries",
+]
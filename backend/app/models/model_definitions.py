@@ -1,5 +1,5 @@
 from typing import Annotated, Any
-from sqlalchemy import String, Text, ForeignKey, JSON
+from sqlalchemy import BigInteger, Index, String, Text, ForeignKey, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -32,6 +32,10 @@ class Items(Base):
 
 class Images(Base):
     __tablename__ = "images"
+    __table_args__ = (
+        # keyset pagination of the gallery, see get_images
+        Index("ix_images_gallery", "status", "created_at", "image_id"),
+    )
 
     image_id: Mapped[uuid.UUID] = mapped_column(default=uuid.uuid4, primary_key=True)
     created_at: Mapped[timestamp]
@@ -52,6 +56,62 @@ class Images(Base):
     )  # JSONB scores for multiple categories
     analysis: Mapped[str | None] = mapped_column(Text, default=None)
     status: Mapped[str] = mapped_column(String(20), default="uploading")
+    # scores and metrics from services.heuristics, computed before the LLM
+    local_analysis: Mapped[dict[str, Any] | None] = mapped_column(JSON, default=None)
+    # 64 bit difference hash of the thumbnail, used for near-duplicate lookups
+    phash: Mapped[int | None] = mapped_column(BigInteger, default=None)
     items: Mapped[list["Items"]] = relationship(
         "Items", back_populates="image", cascade="all, delete-orphan"
     )
+    derivatives: Mapped[list["ImageDerivatives"]] = relationship(
+        "ImageDerivatives", back_populates="image", cascade="all, delete-orphan"
+    )
+
+
+class ImageDerivatives(Base):
+    __tablename__ = "image_derivatives"
+
+    derivative_id: Mapped[uuid.UUID] = mapped_column(
+        default=uuid.uuid4, primary_key=True
+    )
+    image_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("images.image_id"), index=True
+    )
+    storage_key: Mapped[str] = mapped_column(String(255))
+    format: Mapped[str] = mapped_column(String(10))  # webp, jpeg
+    width_px: Mapped[int]
+    height_px: Mapped[int]
+    size_bytes: Mapped[int]
+    created_at: Mapped[timestamp]
+    image: Mapped["Images"] = relationship("Images", back_populates="derivatives")
+
+
+class AnalysisJobs(Base):
+    __tablename__ = "analysis_jobs"
+
+    job_id: Mapped[uuid.UUID] = mapped_column(default=uuid.uuid4, primary_key=True)
+    image_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("images.image_id"), index=True
+    )
+    # raw bucket key of the original, storage_key on images is the public url
+    source_key: Mapped[str] = mapped_column(String(255))
+    status: Mapped[str] = mapped_column(String(20), default="queued", index=True)
+    # what to do with a near-duplicate: analyze, reuse or reject
+    duplicate_policy: Mapped[str] = mapped_column(String(10), default="analyze")
+    duplicate_of: Mapped[uuid.UUID | None] = mapped_column(default=None)
+    attempts: Mapped[int] = mapped_column(default=0)
+    error: Mapped[str | None] = mapped_column(Text, default=None)
+    created_at: Mapped[timestamp]
+    updated_at: Mapped[timestamp]
+
+
+class AnalysisCacheEntries(Base):
+    __tablename__ = "analysis_cache"
+
+    # sha256 of the resized image pixels, the prompt text and the model name
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(String(100))
+    response: Mapped[dict[str, Any]] = mapped_column(JSON)
+    hit_count: Mapped[int] = mapped_column(default=0)
+    created_at: Mapped[timestamp]
+    last_used_at: Mapped[timestamp] = mapped_column(index=True)
@@ -8,6 +8,8 @@ from .image import (
     ImageResponse,
     ImageListResponse,
     ImageDeleteResponse,
+    ImageDerivativeCreate,
+    ImageDerivativeResponse,
     ImageGalleryImage,
     ImageGalleryResponse,
 )
@@ -21,6 +23,14 @@ from .item import (
     ItemListResponse,
 )
 
+from .job import (
+    JobInTable,
+    JobStatusResponse,
+    UploadAcceptedResponse,
+)
+
+from .realtime import RealtimeTokenResponse
+
 __all__ = [
     # Image schemas
     "ImageBase",
@@ -32,6 +42,8 @@ __all__ = [
     "ImageResponse",
     "ImageListResponse",
     "ImageDeleteResponse",
+    "ImageDerivativeCreate",
+    "ImageDerivativeResponse",
     "ImageGalleryImage",
     "ImageGalleryResponse",
     "BoundingBox",
@@ -40,4 +52,10 @@ __all__ = [
     "ItemBulkCreate",
     "ItemResponse",
     "ItemListResponse",
+    # Job schemas
+    "JobInTable",
+    "JobStatusResponse",
+    "UploadAcceptedResponse",
+    # Realtime schemas
+    "RealtimeTokenResponse",
 ]
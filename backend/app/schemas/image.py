@@ -24,6 +24,7 @@ class ImageBase(BaseModel):
         default=None, description="JSONB scores for multiple categories"
     )
     analysis: str | None = None
+    local_analysis: dict[str, Any] | None = None
     status: str = "pending"
 
 
@@ -40,7 +41,12 @@ class ImageCreate(ImageBase):
 
 
 class ImageCreateURLResponse(BaseModel):
-    presigned_url: dict[str, Any]
+    image_id: uuid.UUID
+    presigned_url: dict[str, Any] = Field(
+        description="POST the file to url as multipart form data with fields"
+    )
+    finalize_url: str
+    expires_in: int
     message: str
 
 
@@ -49,12 +55,19 @@ class ImageAnalysisUpdate(BaseModel):
     is_analysis_complete: bool
     score: dict[str, Any]
     analysis: str
+    local_analysis: dict[str, Any] | None = None
     updated_at: datetime = datetime.now()
 
 
 class ImageUploadUpdate(BaseModel):
     image_id: uuid.UUID
     status: str
+    thumbnail_key: str | None = None
+    thumbnail_width_px: int | None = None
+    thumbnail_height_px: int | None = None
+    width_px: int | None = None  # of the original, unknown for direct uploads
+    height_px: int | None = None
+    phash: int | None = None
 
 
 class ImageResponse(BaseModel):
@@ -70,6 +83,24 @@ class ImageResponse(BaseModel):
         default=None, description="JSONB scores for multiple categories"
     )
     analysis: str | None = None
+    local_analysis: dict[str, Any] | None = None
+    status: str = "pending"
+
+
+class ImageDerivativeCreate(BaseModel):
+    image_id: uuid.UUID
+    storage_key: str
+    format: str
+    width_px: int
+    height_px: int
+    size_bytes: int
+
+
+class ImageDerivativeResponse(BaseModel):
+    url: str
+    format: str
+    width_px: int
+    height_px: int
 
 
 class ImageGalleryImage(BaseModel):
@@ -80,10 +111,16 @@ class ImageGalleryImage(BaseModel):
     thumbnail_image: str
     thumbnail_width_px: int
     thumbnail_height_px: int
+    derivatives: list[ImageDerivativeResponse] = Field(
+        default=[], description="Resized copies, ascending width, for srcset"
+    )
 
 
 class ImageGalleryResponse(BaseModel):
     images: list[ImageGalleryImage]
+    cursor: str | None = Field(
+        default=None, description="Pass back to fetch the next page, null on the last"
+    )
 
 
 class ImageListResponse(BaseModel):
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
-from typing import Sequence
+from typing import Literal, Sequence
 import uuid
 
 
@@ -49,3 +49,29 @@ class ItemResponse(BaseModel):
 class ItemListResponse(BaseModel):
     items: Sequence[ItemResponse]
     total: int
+
+
+class ItemSearchQuery(BaseModel):
+    """Filters of an item search, all optional and combined with AND"""
+
+    text: str | None = None  # full text over the item's name and analysis
+    image_text: str | None = None  # full text over the image's analysis
+    name: str | None = None  # substring of the item name, case-insensitive
+    is_positive: bool | None = None
+    region: BoundingBox | None = None  # 0-1000 frame coordinates
+    region_mode: Literal["overlaps", "within"] = "overlaps"
+    min_area: float | None = None  # fraction of the frame, 0-1
+    max_area: float | None = None
+
+
+class ItemSearchResult(ItemResponse):
+    created_at: datetime
+    base_image: str
+    thumbnail_image: str
+
+
+class ItemSearchResponse(BaseModel):
+    items: list[ItemSearchResult]
+    cursor: str | None = Field(
+        default=None, description="Pass back to fetch the next page, null on the last"
+    )
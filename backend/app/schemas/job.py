@@ -0,0 +1,36 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+import uuid
+
+
+class JobInTable(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    job_id: uuid.UUID
+    image_id: uuid.UUID
+    source_key: str
+    status: str
+    duplicate_policy: str = "analyze"
+    duplicate_of: uuid.UUID | None = None
+    attempts: int
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class JobStatusResponse(BaseModel):
+    image_id: uuid.UUID
+    status: str  # image status: pending, processing, complete, failed, duplicate
+    is_analysis_complete: bool = False
+    job_id: uuid.UUID | None = None
+    job_status: str | None = None  # queued, running, complete, failed, rejected
+    duplicate_of: uuid.UUID | None = None
+    attempts: int = 0
+    error: str | None = None
+
+
+class UploadAcceptedResponse(BaseModel):
+    image_id: uuid.UUID
+    job_id: uuid.UUID
+    status: str
+    status_url: str
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class RealtimeTokenResponse(BaseModel):
+    token: str  # pass as ?token= when opening /realtime/frames
+    expires_in: int
+    websocket_url: str
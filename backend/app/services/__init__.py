@@ -1,4 +1,5 @@
 # Services package
+from .analyzer import AnalyzerBackend, FakeAnalyzer, create_analyzer
 from .gemini_service import GeminiService
 
-__all__ = ["GeminiService"]
+__all__ = ["AnalyzerBackend", "FakeAnalyzer", "GeminiService", "create_analyzer"]
@@ -0,0 +1,76 @@
+import logging
+from typing import Any
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.database_async import session_manager
+from app.data_operations.analysis_cache import (
+    get_cached_analysis,
+    prune_cached_analyses,
+    store_cached_analysis,
+)
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY_WRITES = 100
+
+
+class AnalysisResultCache:
+    """Two tier cache for analysis responses: in-memory LRU in front of the db.
+
+    The db tier is best effort, if it is unavailable the analysis still runs.
+    """
+
+    def __init__(
+        self,
+        memory_size: int = settings.ANALYSIS_CACHE_MEMORY_SIZE,
+        ttl_seconds: int = settings.ANALYSIS_CACHE_TTL_SECONDS,
+        max_rows: int = settings.ANALYSIS_CACHE_MAX_ROWS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.memory: LRUCache[str, dict[str, Any]] = LRUCache(memory_size, ttl_seconds)
+        self.db_hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        cached = self.memory.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            async with session_manager.session() as session:
+                cached = await get_cached_analysis(session, key, self.ttl_seconds)
+        except Exception as e:
+            logger.warning("Analysis cache lookup failed: %s", e)
+            cached = None
+
+        if cached is None:
+            self.misses += 1
+            return None
+
+        self.db_hits += 1
+        self.memory.set(key, cached)
+        return cached
+
+    async def set(self, key: str, model: str, response: dict[str, Any]) -> None:
+        self.memory.set(key, response)
+        try:
+            async with session_manager.session() as session:
+                await store_cached_analysis(session, key, model, response)
+                self._writes += 1
+                if self._writes % PRUNE_EVERY_WRITES == 0:
+                    await prune_cached_analyses(
+                        session, self.ttl_seconds, self.max_rows
+                    )
+        except Exception as e:
+            logger.warning("Analysis cache write failed: %s", e)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "memory_size": len(self.memory),
+            "memory_hits": self.memory.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+        }
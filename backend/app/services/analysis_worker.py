@@ -0,0 +1,413 @@
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any
+
+from PIL import Image, UnidentifiedImageError
+
+from app.core.config import settings
+from app.core.database_async import session_manager
+from app.core.metrics import timed
+from app.data_operations.basic_bucket import delete_file, download_file, upload_many
+from app.data_operations.basic_images import get_image_by_id, update_image_status
+from app.data_operations.items import get_items_for_image
+from app.data_operations.jobs import (
+    claim_job,
+    complete_job,
+    delete_stale_uploads,
+    get_job,
+    get_unfinished_jobs,
+    requeue_stale_jobs,
+    set_job_status,
+)
+from app.schemas.image import (
+    ImageAnalysisUpdate,
+    ImageDerivativeCreate,
+    ImageUploadUpdate,
+)
+from app.schemas.item import BoundingBox, ItemBulkCreate, ItemCreate
+from app.services.duplicate_index import duplicate_index
+from app.services.gallery_cache import gallery_cache
+from app.services.analyzer import AnalyzerBackend
+from app.services.image_processing import image_processor
+
+logger = logging.getLogger(__name__)
+
+# the same bytes fail the same way every time, retrying only delays the failure
+PERMANENT_ERRORS: tuple[type[Exception], ...] = (
+    UnidentifiedImageError,
+    Image.DecompressionBombError,
+)
+# a finalize may follow an upload made in the presigned form's last moments
+STALE_UPLOAD_GRACE = timedelta(minutes=1)
+
+
+class AnalysisWorkerPool:
+    """Bounded in-process pool that runs gallery analysis jobs in the background.
+
+    Jobs are persisted in the analysis_jobs table before they are submitted, so
+    anything still queued when the process stops is picked up again by
+    resume_unfinished() on the next start, and a periodic rescan picks up jobs
+    no queue holds any more. A worker claims its job atomically, so a job held
+    by several processes still runs once. A failed job is retried after an
+    exponential backoff, unless its error is one of PERMANENT_ERRORS.
+    Direct uploads that were never finalized are swept up in the background.
+    """
+
+    def __init__(
+        self,
+        analyzer: AnalyzerBackend,
+        workers: int = settings.ANALYSIS_WORKERS,
+        queue_size: int = settings.ANALYSIS_QUEUE_SIZE,
+        max_attempts: int = settings.ANALYSIS_MAX_ATTEMPTS,
+        retry_base_delay: float = settings.ANALYSIS_RETRY_BASE_SECONDS,
+        retry_max_delay: float = settings.ANALYSIS_RETRY_MAX_SECONDS,
+    ):
+        self.analyzer = analyzer
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._queue: asyncio.Queue[tuple[uuid.UUID, bytes | None]] = asyncio.Queue(
+            maxsize=queue_size
+        )
+        self._tasks: list[asyncio.Task] = []
+        # ids waiting in _queue, so a rescan doesn't queue them twice
+        self._pending: set[uuid.UUID] = set()
+        # retries waiting out their backoff, resubmitted by the event loop
+        self._retries: dict[uuid.UUID, asyncio.TimerHandle] = {}
+        self._no_retries = asyncio.Event()
+        self._no_retries.set()
+
+    def has_capacity(self) -> bool:
+        return not self._queue.full()
+
+    def submit(self, job_id: uuid.UUID, data: bytes | None = None) -> bool:
+        """Queue a persisted job; without data the original is read from the bucket.
+
+        Never raises on a full queue: the job is already durable, so it is left
+        to the periodic rescan and False is returned.
+        """
+        try:
+            self._queue.put_nowait((job_id, data))
+        except asyncio.QueueFull:
+            logger.warning("Queue full, job %s is left to the rescan", job_id)
+            return False
+        self._pending.add(job_id)
+        return True
+
+    async def enqueue(self, job_id: uuid.UUID, data: bytes | None = None) -> None:
+        """Like submit, but waits for room in the queue instead of failing"""
+        await self._queue.put((job_id, data))
+        self._pending.add(job_id)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "retrying": len(self._retries),
+            "workers": self.workers,
+        }
+
+    async def join(self) -> None:
+        """Wait until every queued job, retries included, has been processed"""
+        while True:
+            await self._queue.join()
+            if not self._retries:
+                return
+            await self._no_retries.wait()
+
+    async def start(self) -> None:
+        for n in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(n)))
+        self._tasks.append(asyncio.create_task(self._rescan_unfinished()))
+        self._tasks.append(asyncio.create_task(self._sweep_stale_uploads()))
+        logger.info("Started %s analysis workers", self.workers)
+
+    async def stop(self) -> None:
+        # pending retries are still queued in the table, the next start resumes them
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        self._no_retries.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        logger.info("Stopped analysis workers")
+
+    async def resume_unfinished(self, queued_before: datetime | None = None) -> int:
+        """Queue unfinished jobs this process doesn't already hold, returns how
+        many. Running jobs untouched for ANALYSIS_STALE_RUNNING_SECONDS go back
+        to queued first; with queued_before only jobs queued earlier are taken.
+        """
+        running_before = datetime.now() - timedelta(
+            seconds=settings.ANALYSIS_STALE_RUNNING_SECONDS
+        )
+        async with session_manager.session() as session:
+            await requeue_stale_jobs(session, running_before)
+            jobs = await get_unfinished_jobs(session, queued_before)
+
+        jobs = [
+            job
+            for job in jobs
+            if job.job_id not in self._pending and job.job_id not in self._retries
+        ]
+        if jobs:
+            logger.info("Resuming %s unfinished analysis jobs", len(jobs))
+        for job in jobs:
+            # waits for room instead of failing, resumed jobs are already durable
+            await self.enqueue(job.job_id)
+        return len(jobs)
+
+    async def _rescan_unfinished(self) -> None:
+        # the first pass takes everything, later ones leave alone jobs queued
+        # recently enough to still be in a queue or waiting out a retry backoff
+        queued_before = None
+        while True:
+            try:
+                await self.resume_unfinished(queued_before)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Rescanning unfinished analysis jobs failed: %s", e)
+            await asyncio.sleep(settings.ANALYSIS_RESCAN_INTERVAL_SECONDS)
+            queued_before = datetime.now() - timedelta(seconds=self.retry_max_delay)
+
+    async def sweep_stale_uploads(self) -> int:
+        """Delete the rows and objects of direct uploads never finalized within
+        DIRECT_UPLOAD_EXPIRES_SECONDS, returns how many went"""
+        created_before = (
+            datetime.now()
+            - timedelta(seconds=settings.DIRECT_UPLOAD_EXPIRES_SECONDS)
+            - STALE_UPLOAD_GRACE
+        )
+        async with session_manager.session() as session:
+            stale = await delete_stale_uploads(session, created_before)
+        # the row goes first, so an upload finalized meanwhile keeps its object
+        for image_id in stale:
+            try:
+                await delete_file(str(image_id))
+            except Exception as e:
+                logger.warning("Could not delete abandoned upload %s: %s", image_id, e)
+        return len(stale)
+
+    async def _sweep_stale_uploads(self) -> None:
+        while True:
+            try:
+                await self.sweep_stale_uploads()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Sweeping abandoned uploads failed: %s", e)
+            await asyncio.sleep(settings.DIRECT_UPLOAD_SWEEP_INTERVAL_SECONDS)
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            job_id, data = await self._queue.get()
+            self._pending.discard(job_id)
+            try:
+                await self._run_job(job_id, data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Analysis job %s failed: %s", job_id, e, exc_info=True)
+                await self._handle_failure(job_id, data, e)
+            finally:
+                self._queue.task_done()
+
+    @timed("worker.job")
+    async def _run_job(self, job_id: uuid.UUID, data: bytes | None) -> None:
+        # short-lived sessions only, no connection is held during S3 or Gemini calls
+        async with session_manager.session() as session:
+            job = await claim_job(session, job_id)
+            if not job:
+                logger.info("Analysis job %s is not queued any more, skipping", job_id)
+                return
+            await update_image_status(
+                session, ImageUploadUpdate(image_id=job.image_id, status="processing")
+            )
+        image_id, source_key = job.image_id, job.source_key
+
+        if data is None:
+            data = await download_file(source_key)
+
+        processed = await image_processor.process(data, with_derivatives=True)
+        phash = processed.phash
+        duplicate_of = duplicate_index.nearest(phash, settings.DUPLICATE_MAX_DISTANCE)
+
+        if duplicate_of and job.duplicate_policy == "reject":
+            # the images row stays, status "duplicate", so /{image_id}/status can
+            # still tell the client what it duplicated; only the stored original
+            # goes, the gallery never lists a duplicate
+            async with session_manager.session() as session:
+                await update_image_status(
+                    session,
+                    ImageUploadUpdate(
+                        image_id=image_id,
+                        status="duplicate",
+                        width_px=processed.width_px,
+                        height_px=processed.height_px,
+                        phash=phash,
+                    ),
+                )
+                await set_job_status(
+                    session, job_id, "rejected", duplicate_of=duplicate_of
+                )
+            logger.info("Rejected image %s as duplicate of %s", image_id, duplicate_of)
+            try:
+                await delete_file(source_key)
+            except Exception as e:
+                # the job is already settled, an orphaned object only costs storage
+                logger.warning("Could not delete rejected upload %s: %s", source_key, e)
+            return
+
+        # every derivative goes up concurrently, latency is the slowest put
+        thumbnail_key, *derivative_keys = await upload_many(
+            [(processed.thumbnail, "image/jpeg")]
+            + [(d.data, d.content_type) for d in processed.derivatives]
+        )
+
+        gemini_response = None
+        if duplicate_of and job.duplicate_policy == "reuse":
+            gemini_response = await self._load_analysis(duplicate_of)
+        if gemini_response is None:
+            with timed("analyze"):
+                gemini_response = await self.analyzer.analyze_image_async(
+                    processed.analysis_image
+                )
+
+        items = ItemBulkCreate(
+            image_id=image_id,
+            items=[
+                ItemCreate(
+                    image_id=image_id,
+                    name=item["name"],
+                    bounding_box=BoundingBox(
+                        y_min=item["bounding_box"]["y_min"],
+                        y_max=item["bounding_box"]["y_max"],
+                        x_min=item["bounding_box"]["x_min"],
+                        x_max=item["bounding_box"]["x_max"],
+                    ),
+                    analysis=item["analysis"],
+                    created_at=datetime.now(),
+                    is_positive=item["is_perfect"] == "true",
+                )
+                for item in gemini_response["objects"]
+            ],
+        )
+        derivatives = [
+            ImageDerivativeCreate(
+                image_id=image_id,
+                storage_key=f"{settings.AWS_PUBLIC_BUCKET_URL}{key}",
+                format=derivative.format,
+                width_px=derivative.width_px,
+                height_px=derivative.height_px,
+                size_bytes=len(derivative.data),
+            )
+            for derivative, key in zip(processed.derivatives, derivative_keys)
+        ]
+
+        async with session_manager.session() as session:
+            item_ids = await complete_job(
+                session,
+                job_id,
+                upload=ImageUploadUpdate(
+                    image_id=image_id,
+                    status="complete",
+                    thumbnail_key=f"{settings.AWS_PUBLIC_BUCKET_URL}{thumbnail_key}",
+                    thumbnail_width_px=processed.thumbnail_width_px,
+                    thumbnail_height_px=processed.thumbnail_height_px,
+                    width_px=processed.width_px,
+                    height_px=processed.height_px,
+                    phash=phash,
+                ),
+                analysis=ImageAnalysisUpdate(
+                    image_id=image_id,
+                    is_analysis_complete=True,
+                    score=gemini_response["scores"],
+                    analysis=gemini_response["analysis"],
+                    local_analysis=processed.local_analysis,
+                    updated_at=datetime.now(),
+                ),
+                items=items,
+                derivatives=derivatives,
+                duplicate_of=duplicate_of,
+            )
+        if item_ids is None:
+            logger.warning(
+                "Analysis job %s was taken over by another worker, result dropped",
+                job_id,
+            )
+            return
+
+        duplicate_index.add(phash, image_id)
+        gallery_cache.invalidate()
+        logger.info("Completed analysis job %s for image %s", job_id, image_id)
+
+    async def _load_analysis(self, image_id: uuid.UUID) -> dict[str, Any] | None:
+        """Rebuild an analysis response from a stored image and its items"""
+        async with session_manager.session() as session:
+            image = await get_image_by_id(session, str(image_id))
+            if not image or not image.is_analysis_complete:
+                return None
+            items, _ = await get_items_for_image(session, str(image_id))
+
+        return {
+            "analysis": image.analysis,
+            "scores": image.score,
+            "objects": [
+                {
+                    "name": item.name,
+                    "bounding_box": item.bounding_box,
+                    "analysis": item.analysis,
+                    "is_perfect": "true" if item.is_positive else "false",
+                }
+                for item in items
+            ],
+        }
+
+    async def _handle_failure(
+        self, job_id: uuid.UUID, data: bytes | None, error: Exception
+    ) -> None:
+        retryable = not isinstance(error, PERMANENT_ERRORS)
+        try:
+            async with session_manager.session() as session:
+                job = await get_job(session, job_id)
+                if not job:
+                    return
+
+                attempts = job.attempts
+                if retryable and attempts < self.max_attempts:
+                    await set_job_status(session, job_id, "queued", error=str(error))
+                else:
+                    await set_job_status(session, job_id, "failed", error=str(error))
+                    await update_image_status(
+                        session,
+                        ImageUploadUpdate(image_id=job.image_id, status="failed"),
+                    )
+                    return
+        except Exception as e:
+            # the job stays unfinished in the table and is retried on next start
+            logger.error("Could not record failure of job %s: %s", job_id, e)
+            return
+
+        delay = self.retry_delay(attempts)
+        logger.info("Retrying analysis job %s in %.1fs", job_id, delay)
+        self._retries[job_id] = asyncio.get_running_loop().call_later(
+            delay, self._resubmit, job_id, data
+        )
+        self._no_retries.clear()
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff with jitter, so jobs that failed together (a
+        Gemini outage) don't all come back at the same moment"""
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        return random.uniform(delay / 2, delay)
+
+    def _resubmit(self, job_id: uuid.UUID, data: bytes | None) -> None:
+        del self._retries[job_id]
+        if not self._retries:
+            self._no_retries.set()
+        self.submit(job_id, data)
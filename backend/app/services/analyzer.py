@@ -0,0 +1,140 @@
+"""The interface every image analysis backend implements.
+
+A backend returns the Gemini response shape (analysis, scores as "1-100"
+strings, objects with 0-1000 bounding boxes), so the API, the analysis
+workers and realtime sessions don't care which one is configured. The
+backend is picked with ANALYZER_BACKEND, see create_analyzer().
+"""
+
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Iterator
+
+from PIL import Image
+
+from app.core.config import settings
+
+SCORE_NAMES = ("composition", "lighting", "color")
+
+
+class AnalyzerBackend(ABC):
+    name: str
+
+    @abstractmethod
+    async def analyze_image_async(
+        self, image: bytes | Image.Image, use_cache: bool = True
+    ) -> dict[str, Any]:
+        """Analyze one image; callers whose input never repeats pass
+        use_cache=False
+        """
+
+    async def analyze_image_stream(
+        self, image: bytes | Image.Image
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """Yield (event, data) as parts of the result become available, then
+        ("done", result). Backends that can't stream emit every part at once.
+        """
+        result = await self.analyze_image_async(image)
+        for event in result_events(result):
+            yield event
+        yield "done", result
+
+    def stats(self) -> dict[str, Any]:
+        return {}
+
+    async def close(self) -> None:
+        """Release what the backend holds, called on shutdown"""
+
+
+def stream_event(path: tuple, value: Any) -> tuple[str, Any] | None:
+    """Map a completed value of the response JSON to a stream event"""
+    match path:
+        case ("analysis",):
+            return "analysis", value
+        case ("scores", str(name)):
+            return "score", {"name": name, "value": value}
+        case ("objects", int(index)) if isinstance(value, dict):
+            return "object", {"index": index, **value}
+    return None
+
+
+def result_events(result: dict[str, Any]) -> Iterator[tuple[str, Any]]:
+    """The stream events of a complete result, in response order"""
+    paths: list[tuple[tuple, Any]] = [(("analysis",), result.get("analysis"))]
+    paths += [(("scores", k), v) for k, v in (result.get("scores") or {}).items()]
+    paths += [(("objects", i), v) for i, v in enumerate(result.get("objects") or [])]
+    for path, value in paths:
+        event = stream_event(path, value)
+        if event:
+            yield event
+
+
+class FakeAnalyzer(AnalyzerBackend):
+    """Deterministic stand-in for tests and benchmarks: the same pixels always
+    get the same result, derived from a hash of a small copy of the image.
+    delay_seconds simulates model latency without using the CPU.
+    """
+
+    name = "fake"
+
+    def __init__(self, delay_seconds: float = settings.FAKE_ANALYZER_DELAY_SECONDS):
+        self.delay_seconds = delay_seconds
+        self.calls = 0
+
+    async def analyze_image_async(
+        self, image: bytes | Image.Image, use_cache: bool = True
+    ) -> dict[str, Any]:
+        self.calls += 1
+        digest = await asyncio.to_thread(self._digest, image)
+        if self.delay_seconds:
+            await asyncio.sleep(self.delay_seconds)
+
+        scores = {
+            name: str(1 + digest[i] * 99 // 255) for i, name in enumerate(SCORE_NAMES)
+        }
+        y, x = digest[3] * 500 // 255, digest[4] * 500 // 255
+        return {
+            "analysis": f"Fake analysis {digest[:4].hex()}.",
+            "scores": scores,
+            "objects": [
+                {
+                    "name": "Subject",
+                    "bounding_box": {
+                        "y_min": y,
+                        "y_max": y + 250,
+                        "x_min": x,
+                        "x_max": x + 250,
+                    },
+                    "analysis": "A deterministic fake object.",
+                    "is_perfect": "true" if digest[5] % 2 else "false",
+                }
+            ],
+        }
+
+    def stats(self) -> dict[str, Any]:
+        return {"calls": self.calls}
+
+    @staticmethod
+    def _digest(image: bytes | Image.Image) -> bytes:
+        if isinstance(image, bytes):
+            return hashlib.sha256(image).digest()
+        small = image.convert("RGB").resize((16, 16))
+        return hashlib.sha256(small.tobytes()).digest()
+
+
+def create_analyzer(backend: str = settings.ANALYZER_BACKEND) -> AnalyzerBackend:
+    """Build the configured backend, imported lazily so an unused one never
+    needs its dependencies or credentials
+    """
+    if backend == "gemini":
+        from app.services.gemini_service import GeminiService
+
+        return GeminiService()
+    if backend == "local":
+        from app.services.local_analyzer import LocalAnalyzer
+
+        return LocalAnalyzer()
+    if backend == "fake":
+        return FakeAnalyzer()
+    raise ValueError(f"Unknown analyzer backend: {backend}")
@@ -0,0 +1,71 @@
+import hashlib
+import logging
+from dataclasses import dataclass
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    body: bytes  # serialized ImageGalleryResponse
+    etag: str  # strong, quoted
+
+
+def etag_for(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match comparison, weak as RFC 9110 requires for this header"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+class GalleryCache:
+    """Serialized gallery pages keyed by (version, cursor, limit).
+
+    The gallery only changes when an image is added to or removed from it;
+    invalidate() bumps the version so every cached page misses. Readers capture
+    the version before querying, so a page built from a read that raced an
+    invalidation is stored under the old version and never served. The TTL
+    bounds staleness when several processes serve the API, each with its own
+    counter.
+    """
+
+    def __init__(
+        self,
+        max_size: int = settings.GALLERY_CACHE_SIZE,
+        ttl_seconds: int = settings.GALLERY_CACHE_TTL_SECONDS,
+    ):
+        self.version = 0
+        self._pages: LRUCache[tuple[int, str | None, int], CachedPage] = LRUCache(
+            max_size, ttl_seconds
+        )
+
+    def get(self, version: int, cursor: str | None, limit: int) -> CachedPage | None:
+        return self._pages.get((version, cursor, limit))
+
+    def set(
+        self, version: int, cursor: str | None, limit: int, body: bytes
+    ) -> CachedPage:
+        page = CachedPage(body=body, etag=etag_for(body))
+        self._pages.set((version, cursor, limit), page)
+        return page
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._pages.clear()
+        logger.debug("Gallery cache invalidated, version %s", self.version)
+
+    def stats(self) -> dict[str, int]:
+        return {"version": self.version, **self._pages.stats()}
+
+
+gallery_cache = GalleryCache()
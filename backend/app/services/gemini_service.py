@@ -1,26 +1,203 @@
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator
 from PIL import Image
 from google import genai
 from google.genai import types
+import asyncio
+import hashlib
 import json
 import io
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
 from app.core.config import settings
+from app.core.json_stream import IncrementalJSONParser
+from app.core.metrics import timed
+from app.services.analyzer import AnalyzerBackend, result_events, stream_event
+from app.services.analysis_cache import AnalysisResultCache
 from app.services.prompt import prompt
 
+PROMPT_DIGEST = hashlib.sha256(prompt.encode()).hexdigest()
+
+
+@dataclass
+class GeminiMetrics:
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    in_flight: int = 0
+    waiting: int = 0
+    queue_wait_seconds_total: float = 0.0
+    queue_wait_seconds_max: float = 0.0
+    call_seconds_total: float = 0.0
+    streams: int = 0
+    first_chunk_seconds_total: float = 0.0
+
+
+class GeminiService(AnalyzerBackend):
+    name = "gemini"
 
-class GeminiService:
     def __init__(self):
         if not settings.GEMINI_API_KEY:
             raise ValueError("Gemini API key environment variable is required")
 
         self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
         self.model = "gemini-2.0-flash"
+        self.cache = AnalysisResultCache()
+        self.metrics = GeminiMetrics()
+        self._semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
 
+    @timed("gemini.analyze_image")
     def analyze_image(self, image: bytes | Image.Image) -> Dict[str, Any]:
-        """Analyze an image using Google Gemini API: later will use a local model"""
+        """Analyze an image using Google Gemini API, blocking"""
 
         # Resize image for API requirements
         resized_image = self._resize_image(image)
+        return self._generate(resized_image)
+
+    async def analyze_image_async(
+        self, image: bytes | Image.Image, use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Analyze an image without blocking the event loop, reusing the stored
+        result for identical input.
+
+        The key covers the resized pixels, the prompt and the model, so editing
+        prompt.py or switching models misses the old entries naturally. Callers
+        whose input never repeats (live camera frames) pass use_cache=False.
+        """
+        resized_image = await asyncio.to_thread(self._resize_image, image)
+        if not use_cache:
+            return await self._generate_async(resized_image)
+
+        key = self.cache_key(resized_image)
+
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = await self._generate_async(resized_image)
+        await self.cache.set(key, self.model, response)
+        return response
+
+    async def analyze_image_stream(
+        self, image: bytes | Image.Image
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """Analyze an image, yielding (event, data) as parts of the result arrive.
+
+        Events, in the order Gemini writes the fields:
+        - analysis: the analysis paragraph
+        - score: {"name", "value"}, once per score
+        - object: one entry of objects with its "index", bounding box included
+        - done: the complete result, the same dict analyze_image_async returns
+        A cached result is replayed as the same events without calling Gemini.
+        """
+        resized_image = await asyncio.to_thread(self._resize_image, image)
+        key = self.cache_key(resized_image)
+
+        cached = await self.cache.get(key)
+        if cached is not None:
+            for cached_event in result_events(cached):
+                yield cached_event
+            yield "done", cached
+            return
+
+        config = types.GenerateContentConfig(response_mime_type="application/json")
+        parser = IncrementalJSONParser()
+        async with self._call_slot():
+            self.metrics.streams += 1
+            started_at = time.perf_counter()
+            deadline = (
+                asyncio.get_running_loop().time() + settings.GEMINI_TIMEOUT_SECONDS
+            )
+            stream = await asyncio.wait_for(
+                self.client.aio.models.generate_content_stream(
+                    model=self.model, contents=[prompt, resized_image], config=config
+                ),
+                timeout=settings.GEMINI_TIMEOUT_SECONDS,
+            )
+            first_chunk = True
+            while True:
+                remaining = deadline - asyncio.get_running_loop().time()
+                try:
+                    chunk = await asyncio.wait_for(anext(stream), timeout=remaining)
+                except StopAsyncIteration:
+                    break
+                if first_chunk:
+                    first_chunk = False
+                    self.metrics.first_chunk_seconds_total += (
+                        time.perf_counter() - started_at
+                    )
+                for path, value in parser.feed(chunk.text or ""):
+                    event = stream_event(path, value)
+                    if event:
+                        yield event
+
+        response = parser.result()
+        await self.cache.set(key, self.model, response)
+        yield "done", response
+
+    @asynccontextmanager
+    async def _call_slot(self):
+        """Hold one of the GEMINI_MAX_CONCURRENCY call slots, recording queue
+        wait, call time and failures
+        """
+        queued_at = time.perf_counter()
+        self.metrics.waiting += 1
+        try:
+            with timed("gemini.queue_wait"):
+                await self._semaphore.acquire()
+        finally:
+            self.metrics.waiting -= 1
+
+        waited = time.perf_counter() - queued_at
+        self.metrics.queue_wait_seconds_total += waited
+        self.metrics.queue_wait_seconds_max = max(
+            self.metrics.queue_wait_seconds_max, waited
+        )
+
+        self.metrics.calls += 1
+        self.metrics.in_flight += 1
+        started_at = time.perf_counter()
+        try:
+            with timed("gemini.call"):
+                yield
+        except TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        except Exception:
+            self.metrics.errors += 1
+            raise
+        finally:
+            self.metrics.in_flight -= 1
+            self.metrics.call_seconds_total += time.perf_counter() - started_at
+            self._semaphore.release()
+
+    async def _generate_async(self, resized_image: Image.Image) -> Dict[str, Any]:
+        """Call Gemini through the async client, at most GEMINI_MAX_CONCURRENCY
+        calls run at once and each one is cut off after GEMINI_TIMEOUT_SECONDS
+        """
+        config = types.GenerateContentConfig(response_mime_type="application/json")
+
+        async with self._call_slot():
+            response = await asyncio.wait_for(
+                self.client.aio.models.generate_content(
+                    model=self.model, contents=[prompt, resized_image], config=config
+                ),
+                timeout=settings.GEMINI_TIMEOUT_SECONDS,
+            )
+
+        return json.loads(response.text)
+
+    def stats(self) -> Dict[str, Any]:
+        return asdict(self.metrics)
+
+    def cache_key(self, resized_image: Image.Image) -> str:
+        normalized = resized_image.convert("RGB")
+        digest = hashlib.sha256()
+        digest.update(f"{self.model}:{PROMPT_DIGEST}:{normalized.size}".encode())
+        digest.update(normalized.tobytes())
+        return digest.hexdigest()
+
+    def _generate(self, resized_image: Image.Image) -> Dict[str, Any]:
         config = types.GenerateContentConfig(response_mime_type="application/json")
 
         response = self.client.models.generate_content(
@@ -37,6 +214,7 @@ class GeminiService:
         pil_image: Image.Image
         if isinstance(image, bytes):
             pil_image = Image.open(io.BytesIO(image))
+            pil_image.draft("RGB", (max_size, max_size))  # reduced JPEG decode
         else:
             pil_image = image
 
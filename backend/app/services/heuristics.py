@@ -0,0 +1,257 @@
+"""Local composition heuristics, a few milliseconds of NumPy instead of a
+Gemini round trip.
+
+analyze() scores exposure, horizon tilt, rule-of-thirds placement and color
+on an already downscaled image and returns the same shape as a Gemini
+response (analysis, scores, objects), plus the raw metrics behind the scores.
+"""
+
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+MAX_SIZE = 384  # longest side analyzed, same as the Gemini input
+LUMA = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+TILT_ANGLES = np.arange(-20, 20.25, 0.5)  # candidate horizon angles, degrees
+MIN_HORIZON_SUPPORT = 0.15  # share of the edge energy on the line
+
+HUE_BINS = 36  # 10 degrees each
+# hue templates after Matsuda, as occupied bins of the hue wheel
+HUE_TEMPLATES = {
+    "analogous": [0, 1],
+    "wide_analogous": list(range(9)),
+    "complementary": [0, 1, 18, 19],
+    "split": list(range(9)) + [18, 19],
+    "half_wheel": list(range(18)),
+}
+
+
+def _rotations(bins: list[int]) -> np.ndarray:
+    """(HUE_BINS, HUE_BINS) mask of the template at every rotation"""
+    mask = np.zeros(HUE_BINS, dtype=np.float32)
+    mask[bins] = 1.0
+    return np.stack([np.roll(mask, shift) for shift in range(HUE_BINS)])
+
+
+TEMPLATE_ROTATIONS = {name: _rotations(bins) for name, bins in HUE_TEMPLATES.items()}
+
+
+def clamp_score(value: float) -> str:
+    """Scores are strings of 1-100, matching the prompt's output"""
+    return str(int(round(min(100.0, max(1.0, value)))))
+
+
+def _smooth(a: np.ndarray) -> np.ndarray:
+    """3x3 mean filter, edges kept by padding"""
+    padded = np.pad(a, 1, mode="edge")
+    height, width = a.shape
+    total = np.zeros(a.shape)
+    for y in range(3):
+        for x in range(3):
+            total += padded[y : y + height, x : x + width]
+    return total / 9
+
+
+def exposure_metrics(luminance: np.ndarray) -> dict[str, float]:
+    histogram = (
+        np.bincount((luminance * 255).astype(np.uint8).ravel(), minlength=256)
+        / luminance.size
+    )
+    cdf = histogram.cumsum()
+    low, high = np.searchsorted(cdf, [0.01, 0.99]) / 255
+    return {
+        "mean_luminance": float(luminance.mean()),
+        "clipped_highlights": float(histogram[250:].sum()),
+        "crushed_shadows": float(histogram[:6].sum()),
+        "dynamic_range": float(high - low),
+    }
+
+
+def horizon_tilt(luminance: np.ndarray) -> tuple[float | None, float]:
+    """Angle of the dominant near-horizontal line, in degrees, and its support.
+
+    A Hough transform restricted to TILT_ANGLES: every mostly-horizontal edge
+    pixel votes, weighted by edge strength, for the line through it at each
+    candidate angle. Positive means the line rises to the right. Returns None
+    when the best line is shorter than a third of the width or carries too
+    little of the edge energy to be a horizon, or when the image is too small
+    to have one.
+    """
+    if min(luminance.shape) < 3:
+        return None, 0.0
+
+    # smoothing keeps the pixel staircase of a slanted edge from looking
+    # like many short horizontal ones
+    gy, gx = np.gradient(_smooth(luminance))
+    magnitude = np.hypot(gx, gy)
+    edge = (magnitude > max(0.02, float(np.percentile(magnitude, 90)))) & (
+        np.abs(gy) > np.abs(gx)
+    )
+    ys, xs = np.nonzero(edge)
+    height, width = luminance.shape
+    if len(xs) < width / 3:
+        return None, 0.0
+
+    # y cos(a) + x sin(a) is constant along a line rising at angle a
+    theta = np.radians(TILT_ANGLES)[:, None]
+    rho = np.rint(ys * np.cos(theta) + xs * np.sin(theta)).astype(np.int64)
+    rho -= rho.min()
+    bins = int(rho.max()) + 1
+    flat = (rho + np.arange(len(TILT_ANGLES))[:, None] * bins).ravel()
+    votes = np.bincount(flat, minlength=len(TILT_ANGLES) * bins).reshape(-1, bins)
+    best = votes.max(axis=1)
+    if best.max() < width / 3:
+        return None, 0.0
+
+    weights = np.bincount(
+        flat, weights=np.tile(magnitude[edge], len(TILT_ANGLES))
+    ).reshape(-1, bins)
+    strongest = weights.max(axis=1)
+    # short lines tie over neighbouring angles, take the middle of the tie
+    ties = np.flatnonzero(strongest >= strongest.max() * 0.98)
+    support = float(strongest.max() / magnitude[edge].sum())
+    if support < MIN_HORIZON_SUPPORT:
+        return None, support
+    return float(TILT_ANGLES[ties].mean()), support
+
+
+def thirds_metrics(blurred: np.ndarray) -> dict[str, float]:
+    """Where the salient region sits relative to the thirds power points.
+
+    Saliency is frequency-tuned (Achanta et al.): distance of each pixel of a
+    blurred copy from the mean color, the top 5% taken as the subject.
+    """
+    offset = blurred - blurred.reshape(-1, 3).mean(0)
+    saliency = np.sqrt((offset * offset).sum(axis=2))
+    subject = saliency >= np.percentile(saliency, 95)
+
+    height, width = saliency.shape
+    ys, xs = np.nonzero(subject)
+    weights = saliency[subject] + 1e-6
+    cx = float(np.average(xs, weights=weights) / max(1, width - 1))
+    cy = float(np.average(ys, weights=weights) / max(1, height - 1))
+
+    thirds = np.array([1 / 3, 2 / 3])
+    distance = float(np.hypot(np.abs(thirds - cx).min(), np.abs(thirds - cy).min()))
+    return {
+        "subject_x": cx,
+        "subject_y": cy,
+        # 0 on a power point, 1 in a corner, the farthest spot from any
+        "thirds_distance": distance / float(np.hypot(1 / 3, 1 / 3)),
+    }
+
+
+def color_metrics(rgb: np.ndarray, hsv: np.ndarray) -> dict[str, float | None]:
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    rg = r - g
+    yb = 0.5 * (r + g) - b
+    # Hasler & Suesstrunk, on the usual 0-255 scale
+    colorfulness = 255 * float(
+        np.hypot(rg.std(), yb.std()) + 0.3 * np.hypot(rg.mean(), yb.mean())
+    )
+
+    # gray world on the pixels that should be grey: unsaturated midtones
+    neutral = (hsv[..., 1] < 64) & (hsv[..., 2] > 50) & (hsv[..., 2] < 205)
+    color_cast = (
+        float(np.hypot(rg[neutral].mean(), yb[neutral].mean()))
+        if neutral.mean() > 0.02
+        else 0.0
+    )
+
+    hue = hsv[..., 0].astype(np.int32) * HUE_BINS // 256
+    weight = (hsv[..., 1].astype(np.float32) / 255) * (hsv[..., 2] / 255)
+    histogram = np.bincount(hue.ravel(), weights=weight.ravel(), minlength=HUE_BINS)
+    total = histogram.sum()
+
+    harmony = None
+    if total > 0.05 * hue.size:  # near-grey images have no hue to judge
+        histogram = histogram / total
+        # share of the hue mass inside the best rotation of each template,
+        # rescaled so a uniform hue wheel scores 0 on every template
+        harmony = max(
+            float(
+                ((rotations @ histogram).max() - rotations[0].mean())
+                / (1 - rotations[0].mean())
+            )
+            for rotations in TEMPLATE_ROTATIONS.values()
+        )
+
+    return {
+        "colorfulness": colorfulness,
+        "color_cast": color_cast,
+        "hue_harmony": harmony,
+    }
+
+
+def _describe(metrics: dict[str, Any]) -> str:
+    notes = []
+    if metrics["clipped_highlights"] > 0.02:
+        notes.append(
+            f"{metrics['clipped_highlights']:.0%} of the frame is blown out, "
+            "consider exposing for the highlights."
+        )
+    if metrics["crushed_shadows"] > 0.05:
+        notes.append(f"{metrics['crushed_shadows']:.0%} of the frame is crushed black.")
+    if metrics["dynamic_range"] < 0.4:
+        notes.append("The tonal range is narrow, the image may look flat.")
+    tilt = metrics["horizon_tilt"]
+    if tilt is not None and 0.5 < abs(tilt) < 10:
+        notes.append(f"The horizon is tilted by {abs(tilt):.1f} degrees.")
+    if metrics["thirds_distance"] > 0.5:
+        notes.append("The main subject sits far from the rule-of-thirds points.")
+    if metrics["color_cast"] > 0.08:
+        notes.append("There is a noticeable color cast in the midtones.")
+    return " ".join(notes) or "Exposure, framing and color look balanced."
+
+
+def analyze(image: Image.Image) -> dict[str, Any]:
+    """Score an image locally, in the shape of a Gemini analysis response"""
+    if max(image.size) > MAX_SIZE:
+        image = image.copy()
+        image.thumbnail((MAX_SIZE, MAX_SIZE))
+    image = image.convert("RGB")
+
+    # reduce() averages pixel blocks in C, a cheap box blur and downscale
+    half = image.reduce(2)
+    rgb = np.asarray(image, dtype=np.float32) / 255
+    half_rgb = np.asarray(half, dtype=np.float32) / 255
+    half_hsv = np.asarray(half.convert("HSV"))
+    quarter_rgb = np.asarray(image.reduce(4), dtype=np.float32) / 255
+
+    metrics: dict[str, Any] = exposure_metrics(rgb @ LUMA)
+    metrics["horizon_tilt"], metrics["horizon_support"] = horizon_tilt(half_rgb @ LUMA)
+    metrics.update(thirds_metrics(quarter_rgb))
+    metrics.update(color_metrics(half_rgb, half_hsv))
+
+    lighting = (
+        100
+        - 300 * max(0.0, metrics["clipped_highlights"] - 0.01)
+        - 200 * max(0.0, metrics["crushed_shadows"] - 0.02)
+        - 80 * max(0.0, abs(metrics["mean_luminance"] - 0.5) - 0.1)
+        - 60 * max(0.0, 0.6 - metrics["dynamic_range"])
+    )
+    tilt = metrics["horizon_tilt"]
+    tilt_penalty = min(40.0, 8 * max(0.0, abs(tilt) - 0.5)) if tilt else 0.0
+    composition = 100 - 50 * metrics["thirds_distance"] - tilt_penalty
+    harmony = metrics["hue_harmony"]
+    color = (
+        100
+        - 30 * (1 - (harmony if harmony is not None else 0.7))
+        - 30 * max(0.0, 1 - metrics["colorfulness"] / 60)
+        - 40 * min(1.0, metrics["color_cast"] / 0.15)
+    )
+
+    return {
+        "analysis": _describe(metrics),
+        "scores": {
+            "composition": clamp_score(composition),
+            "lighting": clamp_score(lighting),
+            "color": clamp_score(color),
+        },
+        "objects": [],
+        "metrics": {
+            key: round(value, 4) if isinstance(value, float) else value
+            for key, value in metrics.items()
+        },
+    }
@@ -0,0 +1,191 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.core.metrics import timed
+from app.services import heuristics
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+THUMBNAIL_SIZE = 750
+ANALYSIS_SIZE = 384  # what Gemini gets, see GeminiService._resize_image
+
+CONTENT_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+ENCODE_OPTIONS: dict[str, dict] = {
+    "jpeg": {"quality": 82, "optimize": True, "progressive": True},
+    "webp": {"quality": 80, "method": 4},
+}
+
+
+@dataclass
+class ProcessedDerivative:
+    width_px: int
+    height_px: int
+    format: str  # key of CONTENT_TYPES
+    data: bytes
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES[self.format]
+
+
+@dataclass
+class ProcessedImage:
+    """Everything derived from one decode of an upload, picklable across processes"""
+
+    width_px: int  # of the original
+    height_px: int
+    thumbnail: bytes  # JPEG
+    thumbnail_width_px: int
+    thumbnail_height_px: int
+    analysis_image: bytes  # JPEG, longest side ANALYSIS_SIZE
+    phash: int
+    derivatives: list[ProcessedDerivative]
+    # heuristics.analyze of the analysis image, None if it failed
+    local_analysis: dict | None
+
+
+def dhash(image: Image.Image) -> int:
+    """64 bit difference hash, stable across resizes and JPEG re-encodes.
+
+    Expects an already downscaled image (the thumbnail), shrinking a full
+    resolution original to 9x8 here would be wasted work. The value is returned
+    as a signed int so it fits a Postgres BIGINT.
+    """
+    small = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    value = int(np.packbits(bits).view(">u8")[0])
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def _encode(image: Image.Image, format: str, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=format.upper(), **options)
+    return buffer.getvalue()
+
+
+def fit_within(width: int, height: int, max_size: int) -> tuple[int, int]:
+    """Size of width x height scaled down to fit a max_size square"""
+    scale = min(1.0, max_size / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def process_image(
+    data: bytes,
+    derivative_sizes: tuple[int, ...] = (),
+    derivative_formats: tuple[str, ...] = ("jpeg",),
+) -> ProcessedImage:
+    """Decode once and produce every derivative, the analysis input and the hash.
+
+    For JPEGs draft() makes libjpeg scale the DCT by 1/2, 1/4 or 1/8 while
+    decoding, so a 24MP original is decoded straight at roughly the largest
+    size needed instead of in full. Each smaller size is then resized from the
+    previous one rather than from the decode.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        longest = max(width, height)
+        # no upscaling, sizes above the original collapse to the original
+        wanted = {min(size, longest) for size in derivative_sizes}
+        thumbnail_size = min(THUMBNAIL_SIZE, longest)
+        sizes = sorted(wanted | {thumbnail_size}, reverse=True)
+        image.draft("RGB", fit_within(width, height, sizes[0]))
+        current = image.convert("RGB")
+
+    derivatives: list[ProcessedDerivative] = []
+    thumbnail = current
+    for size in sizes:
+        if max(current.size) > size:
+            current = current.resize(
+                fit_within(current.width, current.height, size),
+                Image.Resampling.LANCZOS,
+            )
+        if size == thumbnail_size:
+            thumbnail = current
+        if size in wanted:
+            derivatives.extend(
+                ProcessedDerivative(
+                    width_px=current.width,
+                    height_px=current.height,
+                    format=format,
+                    data=_encode(current, format, **ENCODE_OPTIONS[format]),
+                )
+                for format in derivative_formats
+            )
+
+    analysis_image = thumbnail.copy()
+    analysis_image.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+
+    # a hint next to the real analysis, never a reason to fail an upload
+    try:
+        local_analysis = heuristics.analyze(analysis_image)
+    except Exception as e:
+        logger.warning("Local heuristics failed: %s", e, exc_info=True)
+        local_analysis = None
+
+    return ProcessedImage(
+        width_px=width,
+        height_px=height,
+        thumbnail=_encode(thumbnail, "jpeg", quality=85),
+        thumbnail_width_px=thumbnail.width,
+        thumbnail_height_px=thumbnail.height,
+        analysis_image=_encode(analysis_image, "jpeg", quality=90),
+        phash=dhash(thumbnail),
+        derivatives=derivatives,
+        local_analysis=local_analysis,
+    )
+
+
+class ImageProcessor:
+    """Runs process_image in a process pool so decoding never holds the GIL
+    of the event loop process"""
+
+    def __init__(self, workers: int = settings.IMAGE_PROCESS_WORKERS):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._executor: ProcessPoolExecutor | None = None
+
+    def start(self) -> None:
+        if self._executor is None:
+            # spawn, forking a process that already runs an event loop and
+            # threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info("Started image processing pool with %s workers", self.workers)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    @timed("image.process")
+    async def process(
+        self, data: bytes, with_derivatives: bool = False
+    ) -> ProcessedImage:
+        """Decode in the pool; with_derivatives adds the gallery size pyramid"""
+        self.start()
+        task = partial(process_image, data)
+        if with_derivatives:
+            task = partial(
+                process_image,
+                data,
+                derivative_sizes=tuple(settings.DERIVATIVE_SIZES),
+                derivative_formats=tuple(settings.DERIVATIVE_FORMATS),
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, task)
+
+
+image_processor = ImageProcessor()
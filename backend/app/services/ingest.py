@@ -0,0 +1,61 @@
+import io
+import logging
+import uuid
+from datetime import datetime
+from typing import BinaryIO
+
+from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import timed
+from app.data_operations.basic_bucket import upload_stream
+from app.data_operations.jobs import create_pending_image
+from app.models.model_definitions import AnalysisJobs
+from app.schemas.image import ImageInTable
+
+logger = logging.getLogger(__name__)
+
+
+async def ingest_image(
+    session: AsyncSession,
+    fileobj: BinaryIO,
+    filename: str | None,
+    content_type: str = "image/jpeg",
+    duplicate_policy: str = "analyze",
+) -> AnalysisJobs:
+    """Store an original and record it as a pending gallery image with its job.
+
+    Shared by the upload endpoint and the bulk ingest tool. Only the image
+    header is parsed here, the pixels are decoded by the analysis worker. The
+    caller submits the returned job to an AnalysisWorkerPool.
+    """
+    with timed("ingest.read_header"), Image.open(fileobj) as pil_image:
+        width, height = pil_image.size
+    size_bytes = fileobj.seek(0, io.SEEK_END)
+    fileobj.seek(0)
+
+    # the original goes to the bucket untouched, streamed from the file
+    # instead of being read into memory and re-encoded
+    key = await upload_stream(fileobj, content_type)
+
+    image_data = ImageInTable(
+        image_id=uuid.uuid4(),
+        original_name=filename if filename else "unknown",
+        bucket=settings.AWS_BASIC_BUCKET_NAME,
+        storage_key=f"{settings.AWS_PUBLIC_BUCKET_URL}{key}",
+        thumbnail_key="",
+        size_bytes=size_bytes,
+        mime_type=content_type,
+        width_px=width,
+        height_px=height,
+        thumbnail_width_px=0,
+        thumbnail_height_px=0,
+        created_at=datetime.now(),
+        updated_at=datetime.now(),
+        is_analysis_complete=False,
+        status="pending",
+    )
+    return await create_pending_image(
+        session, image_data, source_key=key, duplicate_policy=duplicate_policy
+    )
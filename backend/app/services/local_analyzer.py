@@ -0,0 +1,127 @@
+"""CPU-only analysis backend, no network and no quota.
+
+The analysis text and metrics come from the NumPy heuristics. When
+LOCAL_MODEL_PATH points at an ONNX score model its scores replace the
+heuristic ones; concurrent requests are then grouped by a MicroBatcher so the
+model runs once per batch instead of once per image.
+"""
+
+import asyncio
+import io
+import logging
+from dataclasses import asdict
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+from app.core.batching import MicroBatcher
+from app.core.config import settings
+from app.services import heuristics
+from app.services.analyzer import SCORE_NAMES, AnalyzerBackend
+
+logger = logging.getLogger(__name__)
+
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)[:, None, None]
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)[:, None, None]
+DEFAULT_INPUT_SIZE = 224
+
+
+class OnnxScorer:
+    """An ONNX score model run on the CPU with ONNX Runtime.
+
+    The model takes one float32 NCHW batch of RGB images at its input size
+    (DEFAULT_INPUT_SIZE when the graph leaves it dynamic), ImageNet
+    normalized, and outputs (N, 3) scores in 0-1 in SCORE_NAMES order.
+    """
+
+    def __init__(self, path: str, threads: int = settings.LOCAL_MODEL_THREADS):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise RuntimeError(
+                "LOCAL_MODEL_PATH is set but onnxruntime is not installed, "
+                "install the backend with the 'local' extra"
+            ) from e
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        size = model_input.shape[-1]
+        self.input_size = size if isinstance(size, int) else DEFAULT_INPUT_SIZE
+
+    def preprocess(self, image: Image.Image) -> np.ndarray:
+        resized = image.convert("RGB").resize(
+            (self.input_size, self.input_size), Image.Resampling.BILINEAR
+        )
+        pixels = np.asarray(resized, dtype=np.float32).transpose(2, 0, 1) / 255
+        return (pixels - IMAGENET_MEAN) / IMAGENET_STD
+
+    def score_batch(self, batch: list[np.ndarray]) -> list[np.ndarray]:
+        outputs = self.session.run(None, {self.input_name: np.stack(batch)})
+        return list(outputs[0])
+
+
+class LocalAnalyzer(AnalyzerBackend):
+    name = "local"
+
+    def __init__(
+        self,
+        model_path: str | None = settings.LOCAL_MODEL_PATH,
+        max_batch: int = settings.LOCAL_BATCH_MAX_SIZE,
+        max_wait_ms: float = settings.LOCAL_BATCH_MAX_WAIT_MS,
+    ):
+        self.calls = 0
+        self.scorer: OnnxScorer | None = None
+        self.batcher: MicroBatcher[np.ndarray, np.ndarray] | None = None
+        if model_path:
+            self.scorer = OnnxScorer(model_path)
+            self.batcher = MicroBatcher(self.scorer.score_batch, max_batch, max_wait_ms)
+            logger.info("Local analyzer scoring with %s", model_path)
+        else:
+            logger.info("Local analyzer without a model, heuristic scores only")
+
+    async def analyze_image_async(
+        self, image: bytes | Image.Image, use_cache: bool = True
+    ) -> dict[str, Any]:
+        """Local results cost milliseconds, there is nothing worth caching"""
+        self.calls += 1
+        result, tensor = await asyncio.to_thread(self._prepare, image)
+        # the tensor is only built when there is a model to batch it for
+        if self.batcher is not None and tensor is not None:
+            scores = await self.batcher.submit(tensor)
+            result["scores"] = {
+                name: heuristics.clamp_score(100 * float(score))
+                for name, score in zip(SCORE_NAMES, scores)
+            }
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        stats: dict[str, Any] = {"calls": self.calls}
+        if self.batcher is not None:
+            stats.update(asdict(self.batcher.metrics))
+        return stats
+
+    async def close(self) -> None:
+        if self.batcher is not None:
+            await self.batcher.close()
+
+    def _prepare(
+        self, image: bytes | Image.Image
+    ) -> tuple[dict[str, Any], np.ndarray | None]:
+        """Decode once, then run the heuristics and build the model input"""
+        pil_image: Image.Image
+        if isinstance(image, bytes):
+            pil_image = Image.open(io.BytesIO(image))
+            pil_image.draft("RGB", (heuristics.MAX_SIZE, heuristics.MAX_SIZE))
+        else:
+            pil_image = image
+        pil_image = pil_image.convert("RGB")
+
+        result = heuristics.analyze(pil_image)
+        tensor = self.scorer.preprocess(pil_image) if self.scorer else None
+        return result, tensor
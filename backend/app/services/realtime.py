@@ -0,0 +1,174 @@
+import asyncio
+import io
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+from PIL import Image
+
+from app.core.admission import AdmissionController, Overloaded
+from app.core.config import settings
+from app.services.analyzer import AnalyzerBackend
+from app.services.image_processing import HASH_BITS, dhash
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_SIZE = 128  # quick feedback never needs more pixels than this
+STEADY_MAX_DISTANCE = 4  # dHash bits that may change between steady frames
+
+
+def quick_feedback(frame: bytes) -> tuple[dict[str, float], int]:
+    """Cheap per-frame exposure feedback and the frame's dHash.
+
+    JPEG frames are decoded at 1/8 scale via draft(), so this stays in the
+    low milliseconds even for full resolution frames.
+    """
+    with Image.open(io.BytesIO(frame)) as image:
+        image.draft("L", (PREVIEW_SIZE, PREVIEW_SIZE))
+        preview = image.convert("L")
+    preview.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+
+    pixels = np.asarray(preview, dtype=np.uint8)
+    feedback = {
+        "brightness": round(float(pixels.mean()) / 255, 3),
+        "clipped_highlights": round(float((pixels >= 250).mean()), 3),
+        "crushed_shadows": round(float((pixels <= 5).mean()), 3),
+    }
+    return feedback, dhash(preview)
+
+
+def hamming(a: int, b: int) -> int:
+    return ((a ^ b) & ((1 << HASH_BITS) - 1)).bit_count()
+
+
+class FramingSession:
+    """Feedback loop for one WebSocket connection streaming camera frames.
+
+    Frames land in a single slot, so a frame that arrives before the previous
+    one was looked at replaces it (latest wins) and the reader never blocks.
+    Every frame that is picked up gets quick exposure/steadiness feedback; at
+    most one full analysis runs at a time and they start at most once per
+    analysis_interval, always on the newest frame, each admitted by the same
+    AdmissionController as inline uploads. Outgoing messages go
+    through a bounded outbox: when the client reads too slowly, quick feedback
+    is dropped while analysis results wait for room.
+    """
+
+    active = 0  # open sessions in this process
+
+    def __init__(
+        self,
+        send: Callable[[dict[str, Any]], Awaitable[None]],
+        analyzer: AnalyzerBackend,
+        admission: AdmissionController,
+        analysis_interval: float = settings.REALTIME_ANALYSIS_INTERVAL_SECONDS,
+        outbox_size: int = settings.REALTIME_OUTBOX_SIZE,
+    ):
+        self._send = send
+        self.analyzer = analyzer
+        self.admission = admission
+        self.analysis_interval = analysis_interval
+        self._outbox: asyncio.Queue[dict[str, Any]] = asyncio.Queue(outbox_size)
+        self._latest: tuple[int, bytes] | None = None
+        self._frame_ready = asyncio.Event()
+        self._analysis_task: asyncio.Task | None = None
+        self._last_analysis_at = -math.inf
+        self._last_hash: int | None = None
+
+        self.received = 0
+        self.dropped_frames = 0
+        self.dropped_messages = 0
+        self.analyses = 0
+
+    def offer(self, frame: bytes) -> None:
+        """Make frame the next one to process, replacing any unprocessed frame"""
+        self.received += 1
+        if self._latest is not None:
+            self.dropped_frames += 1
+        self._latest = (self.received, frame)
+        self._frame_ready.set()
+
+    def push(self, message: dict[str, Any]) -> None:
+        """Queue a message that may be dropped if the client falls behind"""
+        try:
+            self._outbox.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped_messages += 1
+
+    async def run(self) -> None:
+        """Process frames and send messages until cancelled or the send fails"""
+        try:
+            await asyncio.gather(self._process_frames(), self._send_messages())
+        finally:
+            if self._analysis_task:
+                self._analysis_task.cancel()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "received": self.received,
+            "dropped_frames": self.dropped_frames,
+            "dropped_messages": self.dropped_messages,
+            "analyses": self.analyses,
+        }
+
+    async def _process_frames(self) -> None:
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            if self._latest is None:
+                continue
+            seq, frame = self._latest
+            self._latest = None
+
+            try:
+                feedback, frame_hash = await asyncio.to_thread(quick_feedback, frame)
+            except Exception:
+                self.push({"type": "error", "seq": seq, "detail": "Unreadable frame"})
+                continue
+
+            steady = (
+                self._last_hash is not None
+                and hamming(frame_hash, self._last_hash) <= STEADY_MAX_DISTANCE
+            )
+            self._last_hash = frame_hash
+            self.push({"type": "frame", "seq": seq, "steady": steady, **feedback})
+
+            now = time.monotonic()
+            if (
+                self._analysis_task is None
+                and now - self._last_analysis_at >= self.analysis_interval
+            ):
+                self._last_analysis_at = now
+                self._analysis_task = asyncio.create_task(self._analyze(seq, frame))
+
+    async def _analyze(self, seq: int, frame: bytes) -> None:
+        try:
+            # shares the limit on concurrent analyses with inline uploads
+            async with self.admission.admit():
+                # live frames never repeat, caching them would only churn the cache
+                result = await self.analyzer.analyze_image_async(frame, use_cache=False)
+            self.analyses += 1
+            message = {"type": "analysis", "seq": seq, **result, **self.stats()}
+        except Overloaded as e:
+            message = {
+                "type": "error",
+                "seq": seq,
+                "detail": "Server is busy, analysis skipped",
+                "retry_after": e.retry_after,
+            }
+        except TimeoutError:
+            message = {"type": "error", "seq": seq, "detail": "Analysis timed out"}
+        except Exception as e:
+            logger.error("Realtime analysis failed: %s", e, exc_info=True)
+            message = {"type": "error", "seq": seq, "detail": "Analysis failed"}
+        finally:
+            self._analysis_task = None
+        # results are rare and expensive, wait for room instead of dropping
+        await self._outbox.put(message)
+
+    async def _send_messages(self) -> None:
+        while True:
+            message = await self._outbox.get()
+            await self._send(message)
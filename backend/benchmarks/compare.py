@@ -0,0 +1,70 @@
+"""Compare two benchmark reports, scenario by scenario.
+
+    python -m benchmarks.compare before.json after.json
+
+Changes are relative to the first report. For latency and memory a positive
+change is worse, for throughput better.
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+COLUMNS = [
+    ("rps", ("throughput_rps",)),
+    ("p50", ("latency_ms", "p50")),
+    ("p95", ("latency_ms", "p95")),
+    ("p99", ("latency_ms", "p99")),
+    ("rss_mb", ("peak_rss_mb",)),
+    ("errors", ("errors",)),
+]
+
+
+def _get(endpoint: dict[str, Any], path: tuple[str, ...]) -> float | None:
+    value: Any = endpoint
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def _change(before: float | None, after: float | None) -> str:
+    if before is None or after is None:
+        return f"{after}"
+    if before == 0:
+        return f"{after}"
+    return f"{after} ({(after - before) / before:+.1%})"
+
+
+def compare(before: dict[str, Any], after: dict[str, Any]) -> list[str]:
+    lines = [
+        f"before {before['meta'].get('git_commit')}"
+        f" after {after['meta'].get('git_commit')}"
+    ]
+    for name in after["endpoints"]:
+        old = before["endpoints"].get(name)
+        new = after["endpoints"][name]
+        cells = []
+        for label, path in COLUMNS:
+            value = _get(new, path)
+            previous = _get(old, path) if old else None
+            cells.append(f"{label} {_change(previous, value)}")
+        lines.append(f"{name:15} " + "  ".join(cells))
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    before = json.loads(Path(args.before).read_text())
+    after = json.loads(Path(args.after).read_text())
+    print("\n".join(compare(before, after)))
+
+
+if __name__ == "__main__":
+    main()
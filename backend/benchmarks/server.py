@@ -0,0 +1,71 @@
+"""The backend with Gemini and S3 replaced by stand-ins, started by
+benchmarks.run in a child process so its RSS is the app's alone.
+
+    python -m benchmarks.server --port 8123
+
+The database comes from DB_CXN_STRING like in production. The rate limiter
+is disabled, a benchmark is one client sending far more than 10 uploads a
+minute.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--gemini-latency", type=float, default=1.0)
+    parser.add_argument("--gemini-jitter", type=float, default=0.25)
+    parser.add_argument(
+        "--gemini-response", default=None, help="JSON file the fake Gemini answers"
+    )
+    parser.add_argument(
+        "--s3-endpoint",
+        default=None,
+        help="use a real S3-compatible service (MinIO) instead of the in-memory bucket",
+    )
+    args = parser.parse_args()
+
+    # settings are read at import time
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("API_KEY", "benchmark")
+    os.environ.setdefault("ANALYZER_BACKEND", "gemini")
+    os.environ.setdefault("ENV", "benchmark")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    if args.s3_endpoint:
+        os.environ["AWS_ENDPOINT_URL"] = args.s3_endpoint
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import uvicorn
+
+    from app.api import basic
+    from app.core.rate_limit import limiter
+    from app.data_operations import basic_bucket
+    from app.main import app
+    from benchmarks.stand_ins import FakeGeminiClient, InMemoryS3Client
+
+    limiter.enabled = False
+    if basic.analyzer.name == "gemini":
+        response = None
+        if args.gemini_response:
+            response = json.loads(Path(args.gemini_response).read_text())
+        basic.analyzer.client = FakeGeminiClient(
+            args.gemini_latency, args.gemini_jitter, response
+        )
+    if not args.s3_endpoint:
+        basic_bucket.storage._client = InMemoryS3Client()
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""In-process stand-ins for the services the backend reaches over the network.
+
+Both implement only the calls the app makes, so a benchmark measures the
+backend itself rather than Gemini's or S3's latency on the day.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from botocore.exceptions import ClientError
+
+# the shape prompt.py asks Gemini for
+CANNED_RESPONSE: dict[str, Any] = {
+    "analysis": (
+        "The frame places its subject on the left third with a clear line of"
+        " sight into open space. Soft window light from camera right models"
+        " the face, and the warm palette separates the subject from the cool"
+        " background."
+    ),
+    "scores": {"composition": "78", "lighting": "71", "color": "83"},
+    "objects": [
+        {
+            "name": "Subject's Face",
+            "bounding_box": {"y_min": 180, "y_max": 420, "x_min": 220, "x_max": 400},
+            "analysis": "Well exposed and placed on a strong point of the frame.",
+            "is_perfect": "true",
+        },
+        {
+            "name": "Background Lamp",
+            "bounding_box": {"y_min": 40, "y_max": 260, "x_min": 700, "x_max": 820},
+            "analysis": "The bright lamp pulls the eye away, crop it or dim it.",
+            "is_perfect": "false",
+        },
+    ],
+}
+
+
+class FakeGeminiClient:
+    """Answers like google.genai.Client with canned JSON after a delay.
+
+    Covers models.generate_content, aio.models.generate_content and
+    aio.models.generate_content_stream, the calls GeminiService makes. Every
+    call takes latency plus or minus up to jitter seconds; a streamed
+    response spreads that over chunks of chunk_size characters.
+    """
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        jitter: float = 0.25,
+        response: dict[str, Any] | None = None,
+        chunk_size: int = 64,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.text = json.dumps(response or CANNED_RESPONSE)
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.models = SimpleNamespace(generate_content=self._generate)
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(
+                generate_content=self._generate_async,
+                generate_content_stream=self._generate_stream,
+            )
+        )
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def _generate(self, **kwargs) -> SimpleNamespace:
+        self.calls += 1
+        time.sleep(self._delay())
+        return SimpleNamespace(text=self.text)
+
+    async def _generate_async(self, **kwargs) -> SimpleNamespace:
+        self.calls += 1
+        await asyncio.sleep(self._delay())
+        return SimpleNamespace(text=self.text)
+
+    async def _generate_stream(self, **kwargs):
+        self.calls += 1
+        chunks = [
+            self.text[i : i + self.chunk_size]
+            for i in range(0, len(self.text), self.chunk_size)
+        ]
+        per_chunk = self._delay() / len(chunks)
+
+        async def stream():
+            for chunk in chunks:
+                await asyncio.sleep(per_chunk)
+                yield SimpleNamespace(text=chunk)
+
+        return stream()
+
+
+class _Body:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def read(self, *args) -> bytes:
+        return self._data
+
+
+class InMemoryS3Client:
+    """A single bucket in a dict, standing in for the boto3 S3 client.
+
+    Objects are kept for the life of the process, which is what a benchmark
+    run needs; memory use shows up in the server's RSS like a page cache
+    would not, so keep runs to a few thousand uploads.
+    """
+
+    def __init__(self):
+        self.objects: dict[str, tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket: str, Key: str, Body, ContentType: str, **kwargs):
+        data = Body if isinstance(Body, bytes) else Body.read()
+        with self._lock:
+            self.objects[Key] = (data, ContentType)
+        return {}
+
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, ExtraArgs=None, **kwargs):
+        content_type = (ExtraArgs or {}).get("ContentType", "binary/octet-stream")
+        self.put_object(Bucket, Key, Fileobj.read(), content_type)
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> dict[str, Any]:
+        data, content_type = self._get(Key, "NoSuchKey")
+        return {"Body": _Body(data), "ContentType": content_type}
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> dict[str, Any]:
+        data, content_type = self._get(Key, "404")
+        return {"ContentLength": len(data), "ContentType": content_type}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs):
+        with self._lock:
+            self.objects.pop(Key, None)
+        return {}
+
+    def generate_presigned_post(self, Bucket: str, Key: str, **kwargs):
+        fields = {"key": Key, **(kwargs.get("Fields") or {})}
+        return {"url": f"http://benchmark-bucket.invalid/{Bucket}", "fields": fields}
+
+    def _get(self, key: str, code: str) -> tuple[bytes, str]:
+        with self._lock:
+            entry = self.objects.get(key)
+        if entry is None:
+            raise ClientError({"Error": {"Code": code, "Message": key}}, "GetObject")
+        return entry
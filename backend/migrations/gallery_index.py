@@ -0,0 +1,53 @@
+"""Add the index gallery pagination needs to an existing images table.
+
+    cd backend
+    python -m migrations.gallery_index
+
+Not run at startup: a plain CREATE INDEX blocks writes to images for as
+long as the build takes. This one is built CONCURRENTLY, so uploads carry
+on meanwhile. A fresh database gets the index from create_all and needs
+nothing. The statement is idempotent, rerun the script after a failure; a
+concurrent build that failed leaves an INVALID index behind, drop it first.
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.database_async import pool_options
+
+logger = logging.getLogger("migrations.gallery_index")
+
+# keyset pagination of the gallery, see get_images
+GALLERY_INDEX = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_images_gallery"
+    " ON images (status, created_at, image_id)"
+)
+
+
+async def migrate(url: str) -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    engine = create_async_engine(
+        url, isolation_level="AUTOCOMMIT", **pool_options(url, {})
+    )
+    try:
+        async with engine.connect() as conn:
+            if conn.dialect.name != "postgresql":
+                raise SystemExit("The gallery index migration needs PostgreSQL")
+            logger.info("%s", GALLERY_INDEX)
+            await conn.execute(text(GALLERY_INDEX))
+    finally:
+        await engine.dispose()
+    logger.info("Gallery index is set up")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    asyncio.run(migrate(settings.DB_CXN_STRING))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Add the columns and indexes item search needs, once per database.
+
+    cd backend
+    python -m migrations.search_indexes
+
+Not run at startup: adding a stored generated column rewrites the table
+under an ACCESS EXCLUSIVE lock, so run this once, in a quiet window, after
+the app has created its tables. The indexes are built CONCURRENTLY and don't
+block writes. Every statement is idempotent and runs in its own transaction,
+rerun the script after a failure; a concurrent build that failed leaves an
+INVALID index behind, drop it first.
+
+pg_trgm is optional. When the extension can't be created (no contrib
+package, no CREATE privilege on the database) its index is skipped and the
+name filter is a plain, unindexed ILIKE.
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from app.core.config import settings
+from app.core.database_async import pool_options
+
+logger = logging.getLogger("migrations.search_indexes")
+
+COLUMNS = [
+    "ALTER TABLE items ADD COLUMN IF NOT EXISTS search_vector tsvector"
+    " GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A')"
+    " || setweight(to_tsvector('english', coalesce(analysis, '')), 'B')"
+    ") STORED",
+    "ALTER TABLE items ADD COLUMN IF NOT EXISTS box box GENERATED ALWAYS AS (box("
+    "point((bounding_box->>'x_min')::float8, (bounding_box->>'y_min')::float8),"
+    " point((bounding_box->>'x_max')::float8, (bounding_box->>'y_max')::float8)"
+    ")) STORED",
+    # fraction of the frame, bounding boxes are in 0-1000 coordinates
+    "ALTER TABLE items ADD COLUMN IF NOT EXISTS box_area float8 GENERATED ALWAYS AS ("
+    "abs(((bounding_box->>'x_max')::float8 - (bounding_box->>'x_min')::float8)"
+    " * ((bounding_box->>'y_max')::float8 - (bounding_box->>'y_min')::float8))"
+    " / 1000000) STORED",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS search_vector tsvector"
+    " GENERATED ALWAYS AS (to_tsvector('english', coalesce(analysis, ''))) STORED",
+]
+
+INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_search_vector"
+    " ON items USING gin (search_vector)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_box ON items USING gist (box)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_box_area ON items (box_area)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_recent"
+    " ON items (created_at, item_id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_images_search_vector"
+    " ON images USING gin (search_vector)",
+]
+
+TRIGRAM_EXTENSION = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+TRIGRAM_INDEX = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_name_trgm"
+    " ON items USING gin (name gin_trgm_ops)"
+)
+
+
+async def _execute(conn: AsyncConnection, statement: str) -> None:
+    logger.info("%s", statement)
+    await conn.execute(text(statement))
+
+
+async def migrate(url: str) -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    engine = create_async_engine(
+        url, isolation_level="AUTOCOMMIT", **pool_options(url, {})
+    )
+    try:
+        async with engine.connect() as conn:
+            if conn.dialect.name != "postgresql":
+                raise SystemExit("Item search needs PostgreSQL")
+            for statement in COLUMNS + INDEXES:
+                await _execute(conn, statement)
+            try:
+                await _execute(conn, TRIGRAM_EXTENSION)
+            except DBAPIError as e:
+                logger.warning(
+                    "pg_trgm is unavailable, name search will not be indexed: %s",
+                    e.orig,
+                )
+            else:
+                await _execute(conn, TRIGRAM_INDEX)
+    finally:
+        await engine.dispose()
+    logger.info("Item search is set up")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    asyncio.run(migrate(settings.DB_CXN_STRING))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+
+# settings are read at import time, the app's modules need these to import;
+# no test talks to the database or Gemini
+os.environ.setdefault("DB_CXN_STRING", "sqlite+aiosqlite://")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import AdmissionController, Overloaded
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def controller(**overrides) -> AdmissionController:
+    options = dict(
+        initial_limit=2,
+        min_limit=1,
+        max_limit=4,
+        queue_size=1,
+        queue_timeout=0.5,
+        latency_target=10.0,
+    )
+    return AdmissionController(**(options | overrides))
+
+
+async def test_admits_up_to_the_limit_then_queues_then_sheds():
+    admission = controller()
+    first = await admission.acquire()
+    await admission.acquire()
+
+    queued = asyncio.create_task(admission.acquire())
+    await asyncio.sleep(0)
+    assert admission.stats()["queued"] == 1
+
+    with pytest.raises(Overloaded):
+        await admission.acquire()
+    assert admission.shed == 1
+
+    admission.release(first)
+    await queued
+    assert admission.in_flight == 2
+    assert admission.stats()["queued"] == 0
+
+
+async def test_queued_requests_time_out_as_overloaded():
+    admission = controller(initial_limit=1, queue_timeout=0.01)
+    await admission.acquire()
+    with pytest.raises(Overloaded) as raised:
+        await admission.acquire()
+    assert raised.value.retry_after >= 1
+    assert admission.queue_timeouts == 1
+    assert admission.stats()["queued"] == 0
+
+
+async def test_a_cancelled_waiter_gives_up_its_place():
+    admission = controller(initial_limit=1)
+    held = await admission.acquire()
+    waiter = asyncio.create_task(admission.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    admission.release(held)
+    assert admission.in_flight == 0
+    assert admission.stats()["queued"] == 0
+
+
+async def test_admit_releases_on_error():
+    admission = controller()
+    with pytest.raises(RuntimeError):
+        async with admission.admit():
+            assert admission.in_flight == 1
+            raise RuntimeError
+    assert admission.in_flight == 0
+
+
+async def test_fast_requests_grow_the_limit_only_when_saturated():
+    admission = controller()
+    # one at a time never uses the limit of 2
+    for _ in range(10):
+        async with admission.admit():
+            pass
+    assert admission.limit == 2
+
+    for _ in range(10):
+        first = await admission.acquire()
+        second = await admission.acquire()
+        admission.release(first)
+        admission.release(second)
+    assert 2 < admission.limit <= 4
+
+
+async def test_a_slow_request_cuts_the_limit_once_per_burst():
+    admission = controller(initial_limit=4, latency_target=0.01)
+    admitted = [await admission.acquire() for _ in range(4)]
+    await asyncio.sleep(0.02)
+    for admitted_at in admitted:
+        admission.release(admitted_at)
+    assert admission.limit == 3
+    assert admission.decreases == 1
+
+
+async def test_the_limit_never_drops_below_min_limit():
+    admission = controller(initial_limit=2, min_limit=2, latency_target=0.0)
+    admitted_at = await admission.acquire()
+    await asyncio.sleep(0.001)
+    admission.release(admitted_at)
+    assert admission.limit == 2
+
+
+async def test_cancelling_a_waiter_then_releasing_raises_nothing_else():
+    admission = controller(initial_limit=1)
+    held = await admission.acquire()
+    waiter = asyncio.create_task(admission.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    # _wake pops the cancelled future before the waiter's own cleanup runs
+    admission.release(held)
+    (result,) = await asyncio.gather(waiter, return_exceptions=True)
+    assert isinstance(result, asyncio.CancelledError)
+    assert admission.in_flight == 0
+    assert admission.stats()["queued"] == 0
+
+    async with admission.admit():
+        assert admission.in_flight == 1
@@ -0,0 +1,30 @@
+import uuid
+
+import pytest
+
+from app.services.analysis_worker import AnalysisWorkerPool
+from app.services.analyzer import FakeAnalyzer
+
+
+@pytest.fixture
+def pool():
+    return AnalysisWorkerPool(FakeAnalyzer(), retry_base_delay=2, retry_max_delay=30)
+
+
+@pytest.mark.parametrize("attempts, low, high", [(1, 1, 2), (2, 2, 4), (4, 8, 16)])
+def test_retry_delay_doubles_per_attempt(pool, attempts, low, high):
+    delays = [pool.retry_delay(attempts) for _ in range(200)]
+    assert all(low <= delay <= high for delay in delays)
+    assert len(set(delays)) > 1  # jittered
+
+
+def test_retry_delay_is_capped(pool):
+    assert all(15 <= pool.retry_delay(20) <= 30 for _ in range(200))
+
+
+def test_submit_to_a_full_queue_leaves_the_job_to_the_rescan():
+    pool = AnalysisWorkerPool(FakeAnalyzer(), queue_size=1)
+    first, second = uuid.uuid4(), uuid.uuid4()
+    assert pool.submit(first)
+    assert not pool.submit(second)
+    assert pool.stats()["queued"] == 1
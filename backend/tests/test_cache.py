@@ -0,0 +1,54 @@
+from app.core import cache
+from app.core.cache import LRUCache
+
+
+def test_get_and_counters():
+    lru: LRUCache[str, int] = LRUCache(2)
+    assert lru.get("a") is None
+    lru.set("a", 1)
+    assert lru.get("a") == 1
+    assert lru.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_evicts_the_least_recently_used():
+    lru: LRUCache[str, int] = LRUCache(2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")  # b is now the oldest
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1 and lru.get("c") == 3
+    assert len(lru) == 2
+
+
+def test_set_refreshes_an_existing_key():
+    lru: LRUCache[str, int] = LRUCache(2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.set("a", 10)
+    lru.set("c", 3)
+    assert lru.get("a") == 10
+    assert lru.get("b") is None
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    lru: LRUCache[str, int] = LRUCache(10, ttl_seconds=5)
+    lru.set("a", 1)
+    now[0] += 5
+    assert lru.get("a") == 1
+    now[0] += 0.1
+    assert lru.get("a") is None
+    assert len(lru) == 0
+    assert lru.misses == 1
+
+
+def test_pop_and_clear():
+    lru: LRUCache[str, int] = LRUCache(10)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.pop("a") == 1
+    assert lru.pop("a") is None
+    lru.clear()
+    assert len(lru) == 0
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
+
+from app.core.database_async import (
+    DatabaseSessionManager,
+    MeasuredQueuePool,
+    pool_metrics,
+    pool_options,
+)
+
+pytestmark = pytest.mark.anyio
+
+ASYNCPG_URL = "postgresql+asyncpg://user@db/lubezki"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def test_pgbouncer_mode_has_no_pool_and_no_named_statements():
+    options = pool_options(ASYNCPG_URL, {"pool_mode": "pgbouncer"})
+    assert options["poolclass"] is NullPool
+    connect_args = options["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    name = connect_args["prepared_statement_name_func"]
+    assert name() != name()
+
+
+def test_pgbouncer_is_the_default_mode():
+    assert pool_options(ASYNCPG_URL, {})["poolclass"] is NullPool
+
+
+def test_pooled_mode_uses_a_measured_pool_with_statement_cache():
+    options = pool_options(
+        ASYNCPG_URL,
+        {
+            "pool_mode": "pooled",
+            "pool_size": 4,
+            "max_overflow": 2,
+            "pool_timeout": 5,
+            "pool_recycle": 60,
+            "statement_cache_size": 50,
+        },
+    )
+    assert options["poolclass"] is MeasuredQueuePool
+    assert options["pool_size"] == 4
+    assert options["max_overflow"] == 2
+    assert options["pool_timeout"] == 5
+    assert options["pool_recycle"] == 60
+    assert options["pool_pre_ping"]
+    assert options["connect_args"] == {
+        "statement_cache_size": 50,
+        "prepared_statement_cache_size": 50,
+    }
+
+
+@pytest.mark.parametrize("pool_mode", ["pgbouncer", "pooled"])
+def test_other_drivers_get_no_asyncpg_connect_args(pool_mode):
+    options = pool_options("sqlite+aiosqlite://", {"pool_mode": pool_mode})
+    assert "connect_args" not in options
+
+
+async def test_pooled_checkouts_are_measured(tmp_path):
+    manager = DatabaseSessionManager(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        {"pool_mode": "pooled", "pool_size": 2},
+    )
+    connects, checkouts = pool_metrics.connects, pool_metrics.checkouts
+    wait_total = pool_metrics.wait_seconds_total
+    try:
+        await manager.warm_up()
+        assert pool_metrics.connects == connects + 2
+        assert pool_metrics.checked_out == 0
+
+        async with manager.session() as session:
+            await session.execute(text("SELECT 1"))
+            assert pool_metrics.checked_out == 1
+        assert pool_metrics.checked_out == 0
+        # the warmed connections are reused
+        assert pool_metrics.connects == connects + 2
+        assert pool_metrics.checkouts == checkouts + 3
+        assert pool_metrics.wait_seconds_total > wait_total
+        assert manager.pool_stats()["mode"] == "pooled"
+    finally:
+        await manager.close()
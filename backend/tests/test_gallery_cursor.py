@@ -0,0 +1,55 @@
+import base64
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.data_operations.basic_images import (
+    decode_gallery_cursor,
+    encode_gallery_cursor,
+)
+
+
+@pytest.mark.parametrize(
+    "created_at",
+    [
+        datetime(2026, 1, 2, 3, 4, 5),
+        datetime(2026, 1, 2, 3, 4, 5, 678901),
+        datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    ],
+)
+def test_round_trip(created_at):
+    image_id = uuid.uuid4()
+    cursor = encode_gallery_cursor(created_at, image_id)
+    assert decode_gallery_cursor(cursor) == (created_at, image_id)
+
+
+def test_cursor_is_url_safe():
+    # a microsecond timestamp and a random id give every base64 character a chance
+    for _ in range(50):
+        cursor = encode_gallery_cursor(datetime.now(), uuid.uuid4())
+        assert set(cursor) <= set(
+            "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_="
+        )
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not base64!",
+        "zzz",
+        _b64(b"\xff\xfe"),
+        _b64(b"2026-01-01T00:00:00"),
+        _b64(f"yesterday|{uuid.uuid4()}".encode()),
+        _b64(b"2026-01-01T00:00:00|not-a-uuid"),
+        _b64(f"2026-01-01T00:00:00|{uuid.uuid4()}|extra".encode()),
+    ],
+)
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_gallery_cursor(cursor)
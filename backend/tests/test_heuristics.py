@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from app.services import heuristics
+
+SIZES = [(1, 1), (2, 2), (3, 3), (1, 500), (500, 1), (2, 700), (5, 4), (1000, 600)]
+
+
+def noise(width: int, height: int) -> Image.Image:
+    pixels = np.random.default_rng(0).integers(0, 256, (height, width, 3))
+    return Image.fromarray(pixels.astype(np.uint8))
+
+
+def horizon(angle: float, size: tuple[int, int] = (384, 256)) -> Image.Image:
+    """Bright sky over dark ground, the boundary rising to the right"""
+    width, height = size
+    image = Image.new("RGB", size, (40, 60, 40))
+    rise = np.tan(np.radians(angle)) * width / 2
+    sky = [(0, 0), (width, 0), (width, height / 2 - rise), (0, height / 2 + rise)]
+    ImageDraw.Draw(image).polygon(sky, fill=(200, 220, 255))
+    return image
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("mode", ["RGB", "L", "RGBA"])
+def test_any_size_gets_a_complete_result(size, mode):
+    result = heuristics.analyze(noise(*size).convert(mode))
+    assert set(result) == {"analysis", "scores", "objects", "metrics"}
+    assert set(result["scores"]) == {"composition", "lighting", "color"}
+    for score in result["scores"].values():
+        assert 1 <= int(score) <= 100
+    assert result["analysis"]
+    assert result["objects"] == []
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (2, 50), (50, 2), (0, 0)])
+def test_no_horizon_in_images_too_small_to_have_one(shape):
+    assert heuristics.horizon_tilt(np.zeros(shape)) == (None, 0.0)
+
+
+def test_flat_images_have_no_horizon():
+    assert heuristics.horizon_tilt(np.full((100, 100), 0.5))[0] is None
+
+
+@pytest.mark.parametrize("angle", [0.0, 3.0, -5.0])
+def test_finds_a_tilted_horizon(angle):
+    tilt = heuristics.analyze(horizon(angle))["metrics"]["horizon_tilt"]
+    assert tilt == pytest.approx(angle, abs=1.0)
+
+
+def test_large_images_are_analyzed_at_max_size():
+    image = horizon(4.0, (3000, 2000))
+    result = heuristics.analyze(image)
+    assert image.size == (3000, 2000)  # the caller's image is left alone
+    assert result["metrics"]["horizon_tilt"] == pytest.approx(4.0, abs=1.0)
+
+
+@pytest.mark.parametrize(
+    "value, score", [(-5, "1"), (0.4, "1"), (55.5, "56"), (150, "100")]
+)
+def test_clamp_score(value, score):
+    assert heuristics.clamp_score(value) == score
@@ -0,0 +1,136 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database_async import Base
+from app.data_operations.jobs import (
+    claim_job,
+    complete_job,
+    get_job,
+    get_unfinished_jobs,
+    requeue_stale_jobs,
+)
+from app.models.model_definitions import AnalysisJobs, Images
+from app.schemas.image import ImageAnalysisUpdate, ImageUploadUpdate
+from app.schemas.item import ItemBulkCreate
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _add_job(sessions, status="queued", updated_at=None) -> uuid.UUID:
+    image_id = uuid.uuid4()
+    now = datetime.now()
+    async with sessions() as session:
+        session.add(
+            Images(
+                image_id=image_id,
+                created_at=now,
+                original_name="a.jpg",
+                bucket="b",
+                storage_key=str(image_id),
+                thumbnail_key="",
+                size_bytes=1,
+                mime_type="image/jpeg",
+                width_px=0,
+                height_px=0,
+                thumbnail_width_px=0,
+                thumbnail_height_px=0,
+                updated_at=now,
+                status="pending",
+            )
+        )
+        job = AnalysisJobs(
+            image_id=image_id,
+            source_key=str(image_id),
+            status=status,
+            created_at=now,
+            updated_at=updated_at or now,
+        )
+        session.add(job)
+        await session.commit()
+        return job.job_id
+
+
+async def _complete(session, job_id):
+    image_id = (await get_job(session, job_id)).image_id
+    return await complete_job(
+        session,
+        job_id,
+        upload=ImageUploadUpdate(image_id=image_id, status="complete"),
+        analysis=ImageAnalysisUpdate(
+            image_id=image_id,
+            is_analysis_complete=True,
+            score={},
+            analysis="",
+            updated_at=datetime.now(),
+        ),
+        items=ItemBulkCreate(image_id=image_id, items=[]),
+        derivatives=[],
+    )
+
+
+async def test_a_job_is_claimed_once(sessions):
+    job_id = await _add_job(sessions)
+    async with sessions() as session:
+        job = await claim_job(session, job_id)
+        assert job.status == "running"
+        assert job.attempts == 1
+    async with sessions() as session:
+        assert await claim_job(session, job_id) is None
+        assert (await get_job(session, job_id)).attempts == 1
+
+
+async def test_claiming_a_missing_job_returns_none(sessions):
+    async with sessions() as session:
+        assert await claim_job(session, uuid.uuid4()) is None
+
+
+async def test_complete_job_needs_a_running_job(sessions):
+    job_id = await _add_job(sessions)
+    async with sessions() as session:
+        assert await _complete(session, job_id) is None
+        assert (await get_job(session, job_id)).status == "queued"
+
+        await claim_job(session, job_id)
+        assert await _complete(session, job_id) == []
+        assert await _complete(session, job_id) is None
+
+
+async def test_only_stale_running_jobs_are_requeued(sessions):
+    hour_ago = datetime.now() - timedelta(hours=1)
+    stale = await _add_job(sessions, "running", updated_at=hour_ago)
+    fresh = await _add_job(sessions, "running")
+    async with sessions() as session:
+        cutoff = datetime.now() - timedelta(minutes=15)
+        assert await requeue_stale_jobs(session, cutoff) == 1
+        assert (await get_job(session, stale)).status == "queued"
+        assert (await get_job(session, fresh)).status == "running"
+
+
+async def test_unfinished_jobs_can_skip_recently_queued_ones(sessions):
+    old = await _add_job(sessions, updated_at=datetime.now() - timedelta(hours=1))
+    new = await _add_job(sessions)
+    await _add_job(sessions, "running")
+    async with sessions() as session:
+        jobs = await get_unfinished_jobs(session)
+        assert [job.job_id for job in jobs] == [old, new]
+
+        cutoff = datetime.now() - timedelta(minutes=5)
+        jobs = await get_unfinished_jobs(session, cutoff)
+        assert [job.job_id for job in jobs] == [old]
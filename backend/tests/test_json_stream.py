@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from app.core.json_stream import IncrementalJSONParser
+
+DOCUMENT = {
+    "analysis": 'Soft "window" light, \\ and a comma, inside',
+    "scores": {"composition": "78", "lighting": "71"},
+    "objects": [
+        {"name": "Face", "bounding_box": {"x_min": 1, "x_max": 2}},
+        {"name": "Lamp", "is_perfect": False, "weight": -1.5e3, "note": None},
+    ],
+}
+
+
+def feed_in_chunks(text: str, size: int, max_depth: int = 2) -> list:
+    parser = IncrementalJSONParser(max_depth=max_depth)
+    events = []
+    for start in range(0, len(text), size):
+        events += parser.feed(text[start : start + size])
+    assert parser.result() == json.loads(text)
+    return events
+
+
+def test_reports_values_innermost_first():
+    events = feed_in_chunks('{"a": [1, 2]}', 1)
+    assert events == [(("a", 0), 1), (("a", 1), 2), (("a",), [1, 2])]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 10_000])
+def test_chunking_does_not_change_the_events(size):
+    text = json.dumps(DOCUMENT)
+    assert feed_in_chunks(text, size) == feed_in_chunks(text, len(text))
+
+
+def test_paths_and_values_up_to_max_depth():
+    events = dict(feed_in_chunks(json.dumps(DOCUMENT), 5))
+    assert events[("analysis",)] == DOCUMENT["analysis"]
+    assert events[("scores", "lighting")] == "71"
+    assert events[("objects", 0)] == DOCUMENT["objects"][0]
+    assert events[("objects", 1)] == DOCUMENT["objects"][1]
+    assert events[("objects",)] == DOCUMENT["objects"]
+    assert all(len(path) <= 2 for path in events)
+
+
+def test_deeper_paths_with_a_larger_max_depth():
+    events = dict(feed_in_chunks(json.dumps(DOCUMENT), 3, max_depth=4))
+    assert events[("objects", 0, "bounding_box", "x_max")] == 2
+    assert events[("objects", 1, "is_perfect")] is False
+    assert events[("objects", 1, "weight")] == -1500.0
+    assert events[("objects", 1, "note")] is None
+
+
+def test_a_value_is_reported_once_its_closing_character_arrives():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"scores": {"color": "8') == []
+    assert parser.feed('3"') == [(("scores", "color"), "83")]
+    assert parser.feed(', "n": 12') == []
+    assert parser.feed("}") == [
+        (("scores", "n"), 12),
+        (("scores",), {"color": "83", "n": 12}),
+    ]
+
+
+def test_string_keys_are_not_values():
+    events = feed_in_chunks('{"key": "value", "other": {"nested": "x"}}', 1)
+    values = [value for _, value in events]
+    assert "key" not in values and "nested" not in values
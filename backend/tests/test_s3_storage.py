@@ -0,0 +1,80 @@
+import io
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.data_operations.basic_bucket import TRANSFER_CONFIG, S3Storage
+
+pytestmark = pytest.mark.anyio
+
+BUCKET = "test-bucket"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+    with mock_aws():
+        boto3.client("s3").create_bucket(Bucket=BUCKET)
+        yield S3Storage(BUCKET, "https://images.example/", max_connections=4)
+
+
+async def test_put_then_get(storage):
+    key = await storage.put(b"jpeg bytes", "image/jpeg")
+    assert await storage.get(key) == b"jpeg bytes"
+    head = await storage.head(key)
+    assert head is not None
+    assert head["ContentLength"] == len(b"jpeg bytes")
+    assert head["ContentType"] == "image/jpeg"
+    assert storage.url_for(key) == f"https://images.example/{key}"
+
+
+async def test_put_with_a_key_overwrites(storage):
+    await storage.put(b"first", "image/jpeg", key="fixed")
+    assert await storage.put(b"second", "image/webp", key="fixed") == "fixed"
+    assert await storage.get("fixed") == b"second"
+
+
+async def test_put_stream_small_and_multipart(storage):
+    small = b"x" * 1024
+    large = os.urandom(TRANSFER_CONFIG.multipart_threshold + 1024 * 1024)
+    small_key = await storage.put_stream(io.BytesIO(small), "image/jpeg")
+    large_key = await storage.put_stream(io.BytesIO(large), "image/jpeg")
+    assert await storage.get(small_key) == small
+    assert await storage.get(large_key) == large
+    head = await storage.head(large_key)
+    assert head is not None and head["ContentType"] == "image/jpeg"
+
+
+async def test_put_many_returns_keys_in_order(storage):
+    objects = [(f"object {i}".encode(), "image/webp") for i in range(8)]
+    keys = await storage.put_many(objects)
+    assert len(set(keys)) == len(objects)
+    assert [await storage.get(key) for key in keys] == [data for data, _ in objects]
+
+
+async def test_head_of_a_missing_object_is_none(storage):
+    assert await storage.head("missing") is None
+
+
+async def test_delete(storage):
+    key = await storage.put(b"gone soon", "image/jpeg")
+    await storage.delete(key)
+    assert await storage.head(key) is None
+    await storage.delete(key)  # deleting twice is fine
+
+
+def test_presigned_post_is_bound_to_key_and_type(storage):
+    post = storage.presigned_post("upload-key", "image/jpeg", 1024, 60)
+    assert post["fields"]["key"] == "upload-key"
+    assert post["fields"]["Content-Type"] == "image/jpeg"
+    assert BUCKET in post["url"]
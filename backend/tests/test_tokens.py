@@ -0,0 +1,28 @@
+import time
+
+from app.core.tokens import issue_token, verify_token
+
+
+def test_a_token_verifies_for_its_scope_only():
+    token = issue_token("realtime", 60)
+    assert verify_token(token, "realtime")
+    assert not verify_token(token, "admin")
+
+
+def test_an_expired_token_is_refused(monkeypatch):
+    token = issue_token("realtime", 60)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert not verify_token(token, "realtime")
+
+
+def test_a_tampered_token_is_refused():
+    scope, expires, nonce, signature = issue_token("realtime", 60).split(".")
+    later = f"{scope}.{int(expires) + 3600}.{nonce}.{signature}"
+    assert not verify_token(later, "realtime")
+    assert not verify_token(f"{scope}.{expires}.{nonce}.x{signature}", "realtime")
+
+
+def test_garbage_is_refused():
+    for token in ["", "missing", "a.b", "realtime.soon.n.sig", "a.b.c.d.e"]:
+        assert not verify_token(token, "realtime")
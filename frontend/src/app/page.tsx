@@ -1,28 +1,28 @@
 import { ImageGallery, CollapsibleUploadPanel, InteractiveTitle } from '@/components';
-import { Image } from '@/types/image';
+import { GalleryResponse } from '@/types/image';
 
 // Cache the fetch request with ISR
-async function getImages(): Promise<Image[]> {
+async function getFirstPage(): Promise<GalleryResponse> {
   try {
-    const response = await fetch(`${process.env.BACKEND_URL || 'https://lubezki.onrender.com'}/api/v1/basic/`, {
+    // only the first page is rendered here, the gallery loads the rest on scroll
+    const response = await fetch(`${process.env.BACKEND_URL || 'https://lubezki.onrender.com'}/api/v1/basic/?limit=50`, {
       next: { revalidate: 300 } // ISR: revalidate every hour
     });
-    
+
     if (!response.ok) {
-      console.warn('Backend not available during build, returning empty array');
-      return [];
+      console.warn('Backend not available during build, returning an empty gallery');
+      return { images: [] };
     }
-    
-    const data = await response.json();
-    return data.images || [];
+
+    return await response.json();
   } catch (error) {
     console.warn('Failed to fetch gallery data during build:', error);
-    return [];
+    return { images: [] };
   }
 }
 
 export default async function Home() {
-  const images = await getImages();
+  const { images, cursor } = await getFirstPage();
 
   return (
     <main className="min-h-screen max-h-screen relative">
@@ -35,7 +35,7 @@ export default async function Home() {
 
       {/* Gallery Container */}
       <div className="container mx-auto px-4 py-5">
-        <ImageGallery images={images} />
+        <ImageGallery images={images || []} cursor={cursor ?? null} />
       </div>
     </main>
   );
@@ -1,20 +1,59 @@
 "use client";
-import { useState } from "react";
+import { useCallback, useEffect, useRef, useState } from "react";
 import { Image as ImageType, ImageWithItemsResponse } from "@/types/image";
 import ImageCard from "./ImageCard";
 import CompositionScorePanel from "./CompositionScorePanel";
-import { fetchImageData } from "@/services/api";
+import { fetchGalleryPage, fetchImageData } from "@/services/api";
 
 interface ImageGalleryProps {
   images: ImageType[];
+  cursor: string | null; // next page, null once everything is shown
 }
 
-export default function ImageGallery({ images }: ImageGalleryProps) {
+export default function ImageGallery({ images: firstPage, cursor: firstCursor }: ImageGalleryProps) {
+  const [images, setImages] = useState<ImageType[]>(firstPage);
+  const [cursor, setCursor] = useState<string | null>(firstCursor);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const [loadFailed, setLoadFailed] = useState(false);
+  const loadMoreRef = useRef<HTMLDivElement>(null);
   const [selectedImage, setSelectedImage] = useState<ImageType | null>(null);
   const [fullImageData, setFullImageData] = useState<ImageWithItemsResponse | null>(null);
   const [isPanelOpen, setIsPanelOpen] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
 
+  const loadMore = useCallback(async () => {
+    if (!cursor || isLoadingMore) return;
+
+    setIsLoadingMore(true);
+    setLoadFailed(false);
+    try {
+      const page = await fetchGalleryPage(cursor);
+      setImages((shown) => [...shown, ...(page.images || [])]);
+      setCursor(page.cursor ?? null);
+    } catch (error) {
+      // no more loading on scroll, the button retries
+      console.error('Failed to load more images:', error);
+      setLoadFailed(true);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  }, [cursor, isLoadingMore]);
+
+  // load the next page when the end of the grid scrolls into view
+  useEffect(() => {
+    const sentinel = loadMoreRef.current;
+    if (!sentinel || !cursor || loadFailed) return;
+
+    const observer = new IntersectionObserver(
+      (entries) => {
+        if (entries[0].isIntersecting) loadMore();
+      },
+      { rootMargin: '400px' }
+    );
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [cursor, loadFailed, loadMore]);
+
   const handleImageClick = async (image: ImageType) => {
     if (!image.image_id) {
       console.error('No image ID available');
@@ -47,14 +86,26 @@ export default function ImageGallery({ images }: ImageGalleryProps) {
       <div className="space-y-6">
         {/* Image Grid */}
         <div className="grid grid-cols-2 sm:grid-cols-3 md:grid-cols-4 lg:grid-cols-5 gap-4">
-          {images.map((image, index) => (
+          {images.map((image) => (
             <ImageCard
-              key={index}
+              key={image.image_id}
               image={image}
               onClick={handleImageClick}
             />
           ))}
         </div>
+
+        {cursor && (
+          <div ref={loadMoreRef} className="flex justify-center">
+            <button
+              onClick={loadMore}
+              disabled={isLoadingMore}
+              className="px-4 py-2 border border-gray-300 text-gray-700 rounded-lg hover:bg-gray-50 transition-colors text-sm font-medium disabled:opacity-50"
+            >
+              {isLoadingMore ? 'Loading...' : loadFailed ? 'Retry' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Composition Score Panel */}
@@ -1,4 +1,4 @@
-import { ImageWithItemsResponse } from '@/types/image';
+import { GalleryResponse, ImageWithItemsResponse } from '@/types/image';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'https://lubezki.onrender.com/api/v1';
 
@@ -17,3 +17,14 @@ export async function fetchImageData(imageId: string): Promise<ImageWithItemsRes
     throw error;
   }
 }
+
+export async function fetchGalleryPage(cursor: string, limit = 50): Promise<GalleryResponse> {
+  const params = new URLSearchParams({ cursor, limit: String(limit) });
+  const response = await fetch(`${API_BASE_URL}/basic/?${params}`);
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch gallery page: ${response.statusText}`);
+  }
+
+  return response.json();
+}
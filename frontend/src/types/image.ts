@@ -36,6 +36,13 @@ export interface CompositionScore {
   composition: string;
 }
 
+export interface ImageDerivative {
+  url: string;
+  format: 'webp' | 'jpeg';
+  width_px: number;
+  height_px: number;
+}
+
 export interface Image {
   base_image: string;
   thumbnail_image: string;
@@ -45,6 +52,7 @@ export interface Image {
   thumbnail_width_px: number;
   scores?: CompositionScore;
   image_id: string;
+  derivatives?: ImageDerivative[];
 }
 
 export interface UploadResponse {
@@ -54,7 +62,7 @@ export interface UploadResponse {
 
 export interface GalleryResponse {
   images: Image[];
-  total: number;
+  cursor?: string | null;
 }
 
 export interface AnalysisObject {
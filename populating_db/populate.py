@@ -1,11 +1,392 @@
+"""Bulk ingest a directory of JPEGs into the gallery.
+
+    python populate.py images/test --api-key $API_KEY
+    python populate.py images/test --in-process
+
+Files are uploaded by a pool of concurrent workers. Every outcome is appended
+to a manifest (content hash -> image_id/status) next to the images, so a rerun
+skips what already made it into the gallery and retries only what failed.
+429/5xx responses and connection errors are retried with exponential backoff.
+
+--in-process skips HTTP (and its rate limit) and calls the backend's service
+layer directly; it needs the backend's environment (.env) to be available.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import logging
 import os
-import requests
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger("populate")
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg"}
+# image statuses reported by /basic/{image_id}/status
+FINISHED = {"complete", "duplicate"}
+IN_FLIGHT = {"pending", "processing"}
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PermanentError(Exception):
+    pass
+
+
+async def with_retries(
+    fn, retries: int, base_delay: float = 1.0, max_delay: float = 60.0
+):
+    """Call fn until it succeeds, backing off exponentially with full jitter.
+
+    A server supplied Retry-After takes precedence over the computed delay.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await fn()
+        except RetryableError as e:
+            if attempt == retries:
+                raise PermanentError(f"Gave up after {retries} retries: {e}") from e
+            delay = e.retry_after or random.uniform(
+                0, min(max_delay, base_delay * 2**attempt)
+            )
+            logger.debug("Retrying in %.1fs: %s", delay, e)
+            await asyncio.sleep(delay)
+
+
+class Manifest:
+    """Append-only JSONL record of ingested files, the last line per hash wins"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._entries: dict[str, dict[str, Any]] = {}
+        if path.exists():
+            with path.open() as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["sha256"]] = entry
+        self._file = path.open("a")
+
+    def get(self, sha256: str) -> dict[str, Any] | None:
+        return self._entries.get(sha256)
+
+    def record(self, sha256: str, **fields: Any) -> None:
+        entry = {**self._entries.get(sha256, {}), "sha256": sha256, **fields}
+        self._entries[sha256] = entry
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def in_flight(self) -> list[dict[str, Any]]:
+        return [e for e in self._entries.values() if e.get("status") in IN_FLIGHT]
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class HttpBackend:
+    """Uploads through the public API"""
+
+    def __init__(self, url: str, api_key: str, on_duplicate: str, retries: int):
+        self.url = url.rstrip("/")
+        self.api_key = api_key
+        self.on_duplicate = on_duplicate
+        self.retries = retries
+        self._client: httpx.AsyncClient | None = None
+
+    async def __aenter__(self) -> "HttpBackend":
+        self._client = httpx.AsyncClient(
+            headers={"x-api-key": self.api_key},
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._client.aclose()
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        async def attempt() -> httpx.Response:
+            try:
+                response = await self._client.request(
+                    method, f"{self.url}{path}", **kwargs
+                )
+            except httpx.TransportError as e:
+                raise RetryableError(f"{type(e).__name__}: {e}")
+
+            if response.status_code in RETRY_STATUS_CODES:
+                retry_after = response.headers.get("Retry-After")
+                raise RetryableError(
+                    f"HTTP {response.status_code}",
+                    (
+                        float(retry_after)
+                        if retry_after and retry_after.isdigit()
+                        else None
+                    ),
+                )
+            return response
+
+        return await with_retries(attempt, self.retries)
+
+    async def upload(self, path: Path, data: bytes) -> dict[str, Any]:
+        response = await self._request(
+            "POST",
+            "/basic/upload-for-gallery",
+            params={"on_duplicate": self.on_duplicate},
+            files={"file": (path.name, data, "image/jpeg")},
+        )
+        if response.status_code >= 400:
+            raise PermanentError(f"HTTP {response.status_code}: {response.text[:200]}")
+        body = response.json()
+        return {
+            "image_id": body["image_id"],
+            "job_id": body["job_id"],
+            "status": body["status"],
+        }
+
+    async def status(self, image_id: str) -> str | None:
+        response = await self._request("GET", f"/basic/{image_id}/status")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()["status"]
+
+    async def drain(self) -> None:
+        """Jobs run on the server, nothing to wait for"""
+
+
+class InProcessBackend:
+    """Calls the backend's service layer directly, no HTTP and no rate limit"""
+
+    def __init__(self, on_duplicate: str, retries: int):
+        self.on_duplicate = on_duplicate
+        self.retries = retries
+
+    async def __aenter__(self) -> "InProcessBackend":
+        sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+        from app.core.database_async import session_manager
+        from app.services.analysis_worker import AnalysisWorkerPool
+        from app.services.duplicate_index import duplicate_index
+        from app.services.analyzer import create_analyzer
+        from app.services.image_processing import image_processor
+
+        self._session_manager = session_manager
+        self._image_processor = image_processor
+        await session_manager.create_tables()
+        await duplicate_index.rebuild()
+        image_processor.start()
+        self._analyzer = create_analyzer()
+        self._pool = AnalysisWorkerPool(self._analyzer)
+        await self._pool.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._pool.stop()
+        await self._analyzer.close()
+        self._image_processor.shutdown()
+        await self._session_manager.close()
+
+    async def upload(self, path: Path, data: bytes) -> dict[str, Any]:
+        from PIL import UnidentifiedImageError
+
+        from app.services.ingest import ingest_image
+
+        async def attempt() -> dict[str, Any]:
+            try:
+                async with self._session_manager.session() as session:
+                    job = await ingest_image(
+                        session,
+                        io.BytesIO(data),
+                        path.name,
+                        duplicate_policy=self.on_duplicate,
+                    )
+            except UnidentifiedImageError as e:
+                raise PermanentError(str(e))
+            except Exception as e:
+                raise RetryableError(f"{type(e).__name__}: {e}")
+            # only the id, the worker reads the original back from the bucket;
+            # queued bytes would hold a full queue of images in memory
+            await self._pool.enqueue(job.job_id)
+            return {
+                "image_id": str(job.image_id),
+                "job_id": str(job.job_id),
+                "status": "pending",
+            }
+
+        return await with_retries(attempt, self.retries)
+
+    async def status(self, image_id: str) -> str | None:
+        from app.data_operations.basic_images import get_image_by_id
+
+        async with self._session_manager.session() as session:
+            image = await get_image_by_id(session, image_id)
+        return image.status if image else None
+
+    async def drain(self) -> None:
+        """Wait for the local workers to finish every queued analysis"""
+        await self._pool.join()
+
+
+class Progress:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+
+    def report(self) -> None:
+        elapsed = time.monotonic() - self.started_at
+        processed = self.done + self.failed
+        rate = processed / elapsed if elapsed else 0.0
+        remaining = self.total - processed - self.skipped
+        eta = f"{remaining / rate:.0f}s" if rate else "?"
+        logger.info(
+            "%s/%s (uploaded %s, skipped %s, failed %s) %.2f img/s, ETA %s",
+            processed + self.skipped,
+            self.total,
+            self.done,
+            self.skipped,
+            self.failed,
+            rate,
+            eta,
+        )
+
+    async def report_every(self, seconds: float) -> None:
+        while True:
+            await asyncio.sleep(seconds)
+            self.report()
+
+
+async def ingest_file(
+    path: Path, backend, manifest: Manifest, progress: Progress
+) -> None:
+    data = await asyncio.to_thread(path.read_bytes)
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    entry = manifest.get(sha256)
+    if entry and entry.get("status") in FINISHED | IN_FLIGHT:
+        progress.skipped += 1
+        return
+
+    try:
+        result = await backend.upload(path, data)
+    except PermanentError as e:
+        manifest.record(sha256, path=str(path), status="failed", error=str(e))
+        progress.failed += 1
+        logger.warning("%s: %s", path.name, e)
+        return
+
+    manifest.record(sha256, path=str(path), error=None, **result)
+    progress.done += 1
+
+
+async def refresh_in_flight(backend, manifest: Manifest) -> None:
+    """Update entries still pending from an earlier run with their current status.
+
+    Images whose analysis failed, or that no longer exist, are uploaded again.
+    """
+    for entry in manifest.in_flight():
+        try:
+            status = await backend.status(entry["image_id"])
+        except Exception as e:
+            logger.warning("Could not check %s: %s", entry["path"], e)
+            continue
+        if status != entry["status"]:
+            manifest.record(entry["sha256"], status=status or "missing")
+
+
+async def run(args: argparse.Namespace) -> int:
+    directory = Path(args.directory)
+    paths = sorted(p for p in directory.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    manifest = Manifest(
+        Path(args.manifest) if args.manifest else directory / ".ingest-manifest.jsonl"
+    )
+
+    if args.in_process:
+        backend = InProcessBackend(args.on_duplicate, args.retries)
+    else:
+        backend = HttpBackend(args.url, args.api_key, args.on_duplicate, args.retries)
+
+    progress = Progress(len(paths))
+    queue: asyncio.Queue[Path] = asyncio.Queue()
+    for path in paths:
+        queue.put_nowait(path)
+
+    async def worker() -> None:
+        while not queue.empty():
+            path = queue.get_nowait()
+            try:
+                await ingest_file(path, backend, manifest, progress)
+            except Exception as e:
+                progress.failed += 1
+                logger.error("%s: %s", path.name, e)
+
+    async with backend:
+        await refresh_in_flight(backend, manifest)
+        reporter = asyncio.create_task(progress.report_every(args.report_every))
+        try:
+            await asyncio.gather(*(worker() for _ in range(args.workers)))
+            await backend.drain()
+            await refresh_in_flight(backend, manifest)
+        finally:
+            reporter.cancel()
+            manifest.close()
+
+    progress.report()
+    return 1 if progress.failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("directory", help="directory of .jpg/.jpeg files")
+    parser.add_argument(
+        "--url", default="http://localhost:8000/api/v1", help="API base url"
+    )
+    parser.add_argument("--api-key", default=None, help="defaults to $API_KEY")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument(
+        "--manifest",
+        default=None,
+        help="defaults to <directory>/.ingest-manifest.jsonl",
+    )
+    parser.add_argument(
+        "--on-duplicate", choices=["analyze", "reuse", "reject"], default="reuse"
+    )
+    parser.add_argument(
+        "--in-process", action="store_true", help="bypass HTTP, call the service layer"
+    )
+    parser.add_argument(
+        "--report-every",
+        type=float,
+        default=10.0,
+        help="seconds between progress lines",
+    )
+    args = parser.parse_args()
+
+    if not args.in_process and not args.api_key:
+        args.api_key = os.environ.get("API_KEY")
+        if not args.api_key:
+            parser.error("--api-key or $API_KEY is required unless --in-process")
 
-url = "http://localhost:8000/api/v1/basic/upload-for-gallery"
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    sys.exit(asyncio.run(run(args)))
 
-for file in os.listdir("images/test"):
-    with open(f"images/test/{file}", "rb") as f:
-        response = requests.post(url, files={"file": f}, timeout=1000)
-        print(response.json())
 
-# TODO: reupload images and make sure items is populated
+if __name__ == "__main__":
+    main()